@@ -1,7 +1,9 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 from dotenv import load_dotenv
+from log_config import configure_logging, get_logger
 
 # Import routes
 from routes.products import products_bp
@@ -14,8 +16,15 @@ from routes.customers import customers_bp
 load_dotenv()
 
 def create_app():
+    configure_logging()
     app = Flask(__name__)
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'gadgets-store-secret-key')
+
+    # Behind a reverse proxy (e.g. Railway) take the client address from
+    # X-Forwarded-For so per-IP login throttling sees real clients
+    trusted_proxies = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    if trusted_proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies, x_proto=trusted_proxies)
     
     # Enable CORS for frontend
     CORS(app, resources={
@@ -77,8 +86,9 @@ if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_ENV') == 'development'
     
-    print(f"🚀 Starting Gadgets Store API on port {port}")
-    print(f"🔧 Debug mode: {debug}")
-    print(f"🌐 CORS enabled for frontend")
+    logger = get_logger('app')
+    logger.info("Starting Gadgets Store API on port %s", port)
+    logger.info("Debug mode: %s", debug)
+    logger.info("CORS enabled for frontend")
     
     app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
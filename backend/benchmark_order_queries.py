@@ -0,0 +1,204 @@
+"""Benchmark order listing/analytics queries on a synthetic multi-million-order dataset.
+
+Compares the old function-wrapped date filters (DATE(order_date) >= ...) on the
+original single-column indexes against the half-open timestamp ranges on the
+composite (status/customer/payment_method, order_date, total_amount) indexes.
+
+Behavior:
+- Uses a separate database (BENCH_MYSQL_DATABASE, default gadgets_store_bench)
+  so the application data is never touched.
+- Generates BENCH_ORDERS synthetic orders (default 2,000,000) once; later runs
+  reuse the table if it already holds enough rows.
+- Prints the median of BENCH_RUNS executions (default 5) plus the index MySQL
+  chose for each query.
+"""
+
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+import mysql.connector
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STATUSES = ['PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED', 'RETURNED']
+STATUS_WEIGHTS = [5, 10, 10, 65, 7, 3]
+PAYMENT_METHODS = ['CASH', 'CREDIT_CARD', 'DEBIT_CARD', 'BANK_ACCOUNT', 'PAYPAL']
+
+BASELINE_INDEXES = {
+    'idx_order_date': '(order_date)',
+    'idx_customer': '(customer_id)',
+    'idx_status': '(order_status)',
+}
+
+COMPOSITE_INDEXES = {
+    'idx_order_date': '(order_date)',
+    'idx_created_at': '(created_at)',
+    'idx_status_date': '(order_status, order_date, total_amount)',
+    'idx_customer_date': '(customer_id, order_date, total_amount)',
+    'idx_payment_date': '(payment_method, order_date, total_amount)',
+}
+
+
+def build_cases(today):
+    """(name, old query, old params, new query, new params) for each access path"""
+    start = (today - timedelta(days=30)).date()
+    end = (today - timedelta(days=1)).date()
+    start_ts = datetime.combine(start, datetime.min.time())
+    end_ts = datetime.combine(end, datetime.min.time()) + timedelta(days=1)
+    customer_id = 4242
+
+    return [
+        (
+            'get_orders date range',
+            "SELECT order_id FROM orders WHERE DATE(order_date) >= %s AND DATE(order_date) <= %s ORDER BY order_date DESC LIMIT 20",
+            (start, end),
+            "SELECT order_id FROM orders WHERE order_date >= %s AND order_date < %s ORDER BY order_date DESC LIMIT 20",
+            (start_ts, end_ts),
+        ),
+        (
+            'status + date range',
+            "SELECT COUNT(*), SUM(total_amount) FROM orders WHERE order_status = 'SHIPPED' AND DATE(order_date) >= %s AND DATE(order_date) <= %s",
+            (start, end),
+            "SELECT COUNT(*), SUM(total_amount) FROM orders WHERE order_status = 'SHIPPED' AND order_date >= %s AND order_date < %s",
+            (start_ts, end_ts),
+        ),
+        (
+            'customer + date range',
+            "SELECT order_id, order_date, total_amount FROM orders WHERE customer_id = %s AND DATE(order_date) >= %s ORDER BY order_date DESC",
+            (customer_id, start - timedelta(days=335)),
+            "SELECT order_id, order_date, total_amount FROM orders WHERE customer_id = %s AND order_date >= %s ORDER BY order_date DESC",
+            (customer_id, start_ts - timedelta(days=335)),
+        ),
+        (
+            'payment_method analytics',
+            "SELECT payment_method, COUNT(*), SUM(total_amount) FROM orders WHERE DATE(order_date) >= %s AND order_status != 'CANCELLED' GROUP BY payment_method",
+            (start,),
+            "SELECT payment_method, COUNT(*), SUM(total_amount) FROM orders WHERE order_date >= %s AND order_status != 'CANCELLED' GROUP BY payment_method",
+            (start_ts,),
+        ),
+        (
+            'dashboard orders today',
+            "SELECT COUNT(*) FROM orders WHERE DATE(created_at) = CURDATE()",
+            (),
+            "SELECT COUNT(*) FROM orders WHERE created_at >= CURDATE() AND created_at < CURDATE() + INTERVAL 1 DAY",
+            (),
+        ),
+    ]
+
+
+def ensure_dataset(cursor, conn, order_count):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS orders (
+        order_id INT PRIMARY KEY AUTO_INCREMENT,
+        customer_id INT,
+        order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        order_status ENUM('PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED', 'RETURNED') DEFAULT 'PENDING',
+        payment_method ENUM('CASH', 'CREDIT_CARD', 'DEBIT_CARD', 'BANK_ACCOUNT', 'PAYPAL') NOT NULL,
+        total_amount DECIMAL(12,2) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("SELECT COUNT(*) FROM orders")
+    existing = cursor.fetchone()[0]
+    if existing >= order_count:
+        print(f"   ✓ Reusing {existing} existing synthetic orders")
+        return
+
+    print(f"   Generating {order_count - existing} synthetic orders...")
+    rng = random.Random(42)
+    now = datetime.now().replace(microsecond=0)
+    insert_query = """
+    INSERT INTO orders (customer_id, order_date, order_status, payment_method, total_amount, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    """
+    batch_size = 10000
+    remaining = order_count - existing
+    while remaining > 0:
+        rows = []
+        for _ in range(min(batch_size, remaining)):
+            order_date = now - timedelta(seconds=rng.randint(0, 730 * 86400))
+            rows.append((
+                rng.randint(1, 100000),
+                order_date,
+                rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+                rng.choice(PAYMENT_METHODS),
+                round(rng.uniform(10, 3000), 2),
+                order_date,
+            ))
+        cursor.executemany(insert_query, rows)
+        conn.commit()
+        remaining -= len(rows)
+    print("   ✓ Dataset ready")
+
+
+def apply_indexes(cursor, indexes):
+    cursor.execute("SELECT DISTINCT index_name FROM information_schema.statistics WHERE table_schema = DATABASE() AND table_name = 'orders' AND index_name != 'PRIMARY'")
+    for (index_name,) in cursor.fetchall():
+        cursor.execute(f"DROP INDEX `{index_name}` ON orders")
+    for index_name, columns in indexes.items():
+        cursor.execute(f"CREATE INDEX `{index_name}` ON orders {columns}")
+    cursor.execute("ANALYZE TABLE orders")
+    cursor.fetchall()
+
+
+def time_query(cursor, query, params, runs):
+    cursor.execute("EXPLAIN " + query, params)
+    explain = cursor.fetchall()
+    chosen_index = explain[0][5] if explain else None
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), chosen_index
+
+
+def main():
+    host = os.getenv('MYSQL_HOST', 'localhost')
+    user = os.getenv('MYSQL_USER', 'root')
+    password = os.getenv('MYSQL_PASSWORD', '')
+    database = os.getenv('BENCH_MYSQL_DATABASE', 'gadgets_store_bench')
+    order_count = int(os.getenv('BENCH_ORDERS', 2000000))
+    runs = int(os.getenv('BENCH_RUNS', 5))
+
+    print("=" * 50)
+    print("Order query benchmark")
+    print("=" * 50)
+
+    conn = mysql.connector.connect(host=host, user=user, password=password)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+        cursor.execute(f"USE `{database}`")
+        ensure_dataset(cursor, conn, order_count)
+
+        cases = build_cases(datetime.now())
+        results = {}
+
+        print("\n📊 Old filters on original indexes...")
+        apply_indexes(cursor, BASELINE_INDEXES)
+        for name, old_query, old_params, _, _ in cases:
+            results[name] = [time_query(cursor, old_query, old_params, runs)]
+
+        print("📊 Half-open ranges on composite indexes...")
+        apply_indexes(cursor, COMPOSITE_INDEXES)
+        for name, _, _, new_query, new_params in cases:
+            results[name].append(time_query(cursor, new_query, new_params, runs))
+
+        print(f"\n{'query':<28}{'before ms':>12}{'after ms':>12}{'speedup':>10}  index (before -> after)")
+        for name, ((old_ms, old_index), (new_ms, new_index)) in results.items():
+            speedup = old_ms / new_ms if new_ms else float('inf')
+            print(f"{name:<28}{old_ms:>12.2f}{new_ms:>12.2f}{speedup:>9.1f}x  {old_index} -> {new_index}")
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,24 @@
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from log_config import get_logger
 
 load_dotenv()
 
+logger = get_logger('db')
+
+# Shared by every DatabaseConfig instance so the blueprints draw from one pool
+_connection_pool = None
+_connection_pool_lock = threading.Lock()
+_query_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('PARALLEL_QUERY_WORKERS', 8)),
+    thread_name_prefix='parallel-query'
+)
+
 class DatabaseConfig:
     def __init__(self):
         self.host = os.getenv('MYSQL_HOST', 'localhost')
@@ -27,9 +41,32 @@ class DatabaseConfig:
             )
             return connection
         except Error as e:
-            print(f"Error connecting to MySQL: {e}")
+            logger.error("Error connecting to MySQL: %s", e)
             return None
 
+    def get_pooled_connection(self):
+        """Borrow a connection from the shared pool; close() returns it to the pool"""
+        global _connection_pool
+        try:
+            if _connection_pool is None:
+                with _connection_pool_lock:
+                    if _connection_pool is None:
+                        _connection_pool = pooling.MySQLConnectionPool(
+                            pool_name=self.pool_name,
+                            pool_size=self.pool_size,
+                            host=self.host,
+                            user=self.user,
+                            password=self.password,
+                            database=self.database,
+                            autocommit=True,
+                            charset='utf8mb4',
+                            collation='utf8mb4_unicode_ci'
+                        )
+            return _connection_pool.get_connection()
+        except Error:
+            # Pool exhausted or unavailable: fall back to a dedicated connection
+            return self.get_connection()
+
     def execute_query(self, query, params=None, fetch=False):
         connection = self.get_connection()
         if connection:
@@ -47,7 +84,7 @@ class DatabaseConfig:
                     connection.commit()
                     return cursor.rowcount
             except Error as e:
-                print(f"Error executing query: {e}")
+                logger.error("Error executing query: %s", e)
                 return None
             finally:
                 cursor.close()
@@ -70,9 +107,86 @@ class DatabaseConfig:
                 return results
             except Error as e:
                 connection.rollback()
-                print(f"Error executing multiple queries: {e}")
+                logger.error("Error executing multiple queries: %s", e)
                 return None
             finally:
                 cursor.close()
                 connection.close()
-        return None
\ No newline at end of file
+        return None
+
+    def execute_multi_statement(self, statements):
+        """Run several statements in a single round trip on one connection.
+
+        statements is a list of (query, params) tuples; returns one result per
+        statement (rows for SELECTs, rowcount otherwise) in the same order.
+        """
+        connection = self.get_connection()
+        if connection:
+            try:
+                cursor = connection.cursor(dictionary=True)
+                query = ";\n".join(query.strip().rstrip(';') for query, _ in statements)
+                params = [param for _, query_params in statements for param in (query_params or ())]
+                results = []
+                for result in cursor.execute(query, params, multi=True):
+                    if result.with_rows:
+                        results.append(result.fetchall())
+                    else:
+                        results.append(result.rowcount)
+                return results
+            except Error as e:
+                logger.error("Error executing multi-statement query: %s", e)
+                return None
+            finally:
+                cursor.close()
+                connection.close()
+        return None
+
+    def execute_parallel(self, queries, timeout=10):
+        """Run independent read queries concurrently and return {name: rows}.
+
+        queries maps a name to a (query, params) tuple. Queries run on a bounded
+        thread pool with pooled connections and share one deadline, which is also
+        set as the session's max_execution_time so MySQL aborts a query that runs
+        past it and the worker and connection are freed. A query that fails or
+        misses the deadline yields None for its name.
+        """
+        deadline = time.monotonic() + timeout
+        futures = {
+            name: _query_executor.submit(self._fetch_all, query, params, deadline)
+            for name, (query, params) in queries.items()
+        }
+
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except TimeoutError:
+                future.cancel()
+                logger.warning("Parallel query '%s' exceeded %ss deadline", name, timeout)
+                results[name] = None
+            except Error as e:
+                logger.error("Error executing parallel query '%s': %s", name, e)
+                results[name] = None
+        return results
+
+    def _fetch_all(self, query, params, deadline):
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            raise Error("Deadline passed before the query started")
+
+        connection = self.get_pooled_connection()
+        if not connection:
+            raise Error("Database connection failed")
+        cursor = connection.cursor(dictionary=True)
+        try:
+            # Server-side limit (SELECT only); pooled connections keep session
+            # variables, so it is restored before the connection goes back
+            cursor.execute("SET SESSION max_execution_time = %s", (remaining_ms,))
+            try:
+                cursor.execute(query, params or ())
+                return cursor.fetchall()
+            finally:
+                cursor.execute("SET SESSION max_execution_time = DEFAULT")
+        finally:
+            cursor.close()
+            connection.close()
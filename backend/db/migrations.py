@@ -0,0 +1,296 @@
+"""Idempotent upgrades that bring an existing database up to schema.sql.
+
+setup_database.py imports schema.sql only into an empty database. On every
+later run it calls apply_migrations(), which adds the tables, columns,
+indexes, triggers, routines and views that newer code relies on. Every
+step checks information_schema first, so running it again is a no-op.
+Definitions are read from schema.sql itself so the two cannot drift apart:
+a trigger or routine whose installed body differs from schema.sql is
+dropped and recreated.
+"""
+
+import os
+import re
+
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), 'schema.sql')
+
+MIGRATIONS = []
+
+def migration(name):
+    """Register a step; steps run in the order they are defined"""
+    def register(step):
+        MIGRATIONS.append((name, step))
+        return step
+    return register
+
+_schema_sql = None
+
+def schema_statement(kind, name):
+    """Return the CREATE statement for a TABLE, TRIGGER, PROCEDURE, FUNCTION or VIEW from schema.sql"""
+    global _schema_sql
+    if _schema_sql is None:
+        with open(SCHEMA_FILE, 'r', encoding='utf-8') as f:
+            _schema_sql = f.read()
+
+    if kind == 'TABLE':
+        pattern = rf"CREATE TABLE {name} \(.*?\n\);"
+    elif kind == 'VIEW':
+        pattern = rf"CREATE VIEW {name} AS.*?;(?=\n|$)"
+    else:
+        pattern = rf"CREATE {kind} {name}\b.*?\nEND //"
+    match = re.search(pattern, _schema_sql, re.S)
+    if not match:
+        raise LookupError(f'{kind} {name} not found in schema.sql')
+    statement = match.group(0)
+    return statement[:-len(' //')] if statement.endswith(' //') else statement.rstrip(';')
+
+def _scalar(cursor, query, params):
+    cursor.execute(query, params)
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def table_exists(cursor, table):
+    return bool(_scalar(cursor, """
+    SELECT COUNT(*) FROM information_schema.tables
+    WHERE table_schema = DATABASE() AND table_name = %s
+    """, (table,)))
+
+def column_exists(cursor, table, column):
+    return bool(_scalar(cursor, """
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column)))
+
+def index_exists(cursor, table, index):
+    return bool(_scalar(cursor, """
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index)))
+
+def ensure_table(cursor, table):
+    """Create the table from schema.sql if missing; returns True if it was created"""
+    if table_exists(cursor, table):
+        return False
+    cursor.execute(schema_statement('TABLE', table))
+    return True
+
+def ensure_column(cursor, table, column, definition):
+    if not column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def ensure_index(cursor, table, index, columns):
+    if not index_exists(cursor, table, index):
+        cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns})")
+
+def _normalize(body):
+    return ' '.join(body.split())
+
+def ensure_routine(cursor, kind, name):
+    """Install a TRIGGER, PROCEDURE or FUNCTION from schema.sql, replacing an outdated one"""
+    statement = schema_statement(kind, name)
+    body = statement[re.search(r"\bBEGIN\b", statement).start():]
+    if kind == 'TRIGGER':
+        installed = _scalar(cursor, """
+        SELECT action_statement FROM information_schema.triggers
+        WHERE trigger_schema = DATABASE() AND trigger_name = %s
+        """, (name,))
+        exists = installed is not None
+    else:
+        cursor.execute("""
+        SELECT routine_definition FROM information_schema.routines
+        WHERE routine_schema = DATABASE() AND routine_type = %s AND routine_name = %s
+        """, (kind, name))
+        row = cursor.fetchone()
+        exists = row is not None
+        installed = row[0] if row else None
+
+    if exists and installed is not None and _normalize(installed) == _normalize(body):
+        return False
+    if exists:
+        cursor.execute(f"DROP {kind} {name}")
+    cursor.execute(statement)
+    return True
+
+def replace_view(cursor, name):
+    cursor.execute(schema_statement('VIEW', name).replace('CREATE VIEW', 'CREATE OR REPLACE VIEW', 1))
+
+@migration('catalog updated_at columns and indexes')
+def catalog_updated_at(cursor):
+    ensure_column(cursor, 'suppliers', 'updated_at', "TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+    ensure_column(cursor, 'categories', 'updated_at', "TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+    ensure_index(cursor, 'products', 'idx_updated_at', 'updated_at')
+    ensure_index(cursor, 'product_reviews', 'idx_updated_at', 'updated_at')
+
+@migration('stock reservations')
+def stock_reservations(cursor):
+    ensure_column(cursor, 'products', 'reserved_quantity', 'INT DEFAULT 0')
+    ensure_table(cursor, 'stock_reservations')
+
+@migration('sequences')
+def sequences(cursor):
+    ensure_table(cursor, 'sequences')
+    cursor.execute("INSERT IGNORE INTO sequences (sequence_name, next_value) VALUES ('order_number', 1), ('cart_id', 1)")
+
+@migration('order date indexes')
+def order_date_indexes(cursor):
+    ensure_index(cursor, 'orders', 'idx_created_at', 'created_at')
+    ensure_index(cursor, 'orders', 'idx_status_date', 'order_status, order_date, total_amount')
+    ensure_index(cursor, 'orders', 'idx_customer_date', 'customer_id, order_date, total_amount')
+    ensure_index(cursor, 'orders', 'idx_payment_date', 'payment_method, order_date, total_amount')
+
+def rebuild_order_rollup(cursor):
+    """Recompute daily_order_rollup from orders (into slot 0); returns the row count.
+
+    orders is locked for writes meanwhile so no order change is lost or counted twice.
+    """
+    cursor.execute("LOCK TABLES orders READ, daily_order_rollup WRITE")
+    try:
+        cursor.execute("DELETE FROM daily_order_rollup")
+        cursor.execute("""
+        INSERT INTO daily_order_rollup (rollup_date, order_status, payment_method, store_id, order_count, total_amount)
+        SELECT 
+            DATE(order_date),
+            order_status,
+            payment_method,
+            COALESCE(store_id, 0),
+            COUNT(*),
+            SUM(total_amount)
+        FROM orders
+        GROUP BY DATE(order_date), order_status, payment_method, COALESCE(store_id, 0)
+        """)
+        return cursor.rowcount
+    finally:
+        cursor.execute("UNLOCK TABLES")
+
+@migration('daily order rollup')
+def daily_order_rollup(cursor):
+    created = ensure_table(cursor, 'daily_order_rollup')
+    if not created and not column_exists(cursor, 'daily_order_rollup', 'slot'):
+        cursor.execute("""
+        ALTER TABLE daily_order_rollup
+        ADD COLUMN slot TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER store_id,
+        DROP PRIMARY KEY,
+        ADD PRIMARY KEY (rollup_date, order_status, payment_method, store_id, slot)
+        """)
+    for trigger in ('order_rollup_after_insert', 'order_rollup_after_update', 'order_rollup_after_delete'):
+        ensure_routine(cursor, 'TRIGGER', trigger)
+    if created:
+        rebuild_order_rollup(cursor)
+
+@migration('deferred customer totals trigger')
+def customer_total_spent_trigger(cursor):
+    # The bulk status route credits total_spent itself and sets @defer_customer_totals;
+    # the pre-change trigger ignores that flag and would credit customers twice
+    ensure_routine(cursor, 'TRIGGER', 'update_customer_total_spent')
+
+@migration('session revocations')
+def session_revocations(cursor):
+    ensure_table(cursor, 'session_revocations')
+    ensure_column(cursor, 'session_revocations', 'expires_at', 'TIMESTAMP NULL DEFAULT NULL AFTER session_id')
+    ensure_index(cursor, 'session_revocations', 'idx_expires_at', 'expires_at')
+
+def rebuild_customer_stats(cursor):
+    """Recompute customer_stats from orders; returns the number of customers.
+
+    orders is locked for writes meanwhile so no order change is lost or counted twice.
+    """
+    cursor.execute("LOCK TABLES orders READ, customers READ, customer_stats WRITE")
+    try:
+        cursor.execute("DELETE FROM customer_stats")
+        cursor.execute("""
+        INSERT INTO customer_stats (customer_id, order_count, lifetime_value, delivered_count, delivered_amount, last_order_at, last_delivered_at)
+        SELECT 
+            customer_id,
+            COUNT(*),
+            COALESCE(SUM(CASE WHEN order_status != 'CANCELLED' THEN total_amount END), 0),
+            SUM(order_status = 'DELIVERED'),
+            COALESCE(SUM(CASE WHEN order_status = 'DELIVERED' THEN total_amount END), 0),
+            MAX(order_date),
+            MAX(CASE WHEN order_status = 'DELIVERED' THEN order_date END)
+        FROM orders
+        WHERE customer_id IS NOT NULL
+        GROUP BY customer_id
+        """)
+        return cursor.rowcount
+    finally:
+        cursor.execute("UNLOCK TABLES")
+
+@migration('customer stats')
+def customer_stats(cursor):
+    created = ensure_table(cursor, 'customer_stats')
+    # The triggers call refresh_customer_stats, so it is installed first
+    ensure_routine(cursor, 'PROCEDURE', 'refresh_customer_stats')
+    ensure_routine(cursor, 'FUNCTION', 'get_customer_lifetime_value')
+    for trigger in ('customer_stats_after_insert', 'customer_stats_after_update', 'customer_stats_after_delete'):
+        ensure_routine(cursor, 'TRIGGER', trigger)
+    replace_view(cursor, 'customer_summary')
+    if created:
+        rebuild_customer_stats(cursor)
+
+PRINCIPAL_SOURCES = [
+    # user_type, table, key column, role used when the table has no role column
+    ('admin', 'admin_users', 'admin_id', 'admin'),
+    ('employee', 'employees', 'employee_id', 'employee'),
+    ('customer', 'customers', 'customer_id', 'customer'),
+]
+
+def table_columns(cursor, table):
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,)
+    )
+    return {row[0].lower() for row in cursor.fetchall()}
+
+def sync_principals(cursor):
+    """Copy users with a password hash into principals; returns {table: rows synced or None if skipped}.
+
+    Existing principals get the current role, names and is_active but keep their password_hash.
+    """
+    synced = {}
+    for user_type, table, key_column, default_role in PRINCIPAL_SOURCES:
+        columns = table_columns(cursor, table)
+        if 'password_hash' not in columns:
+            synced[table] = None
+            continue
+
+        role = "COALESCE(role, %s)" if 'role' in columns else "%s"
+        is_active = "is_active" if 'is_active' in columns else "TRUE"
+        cursor.execute(f"""
+        INSERT INTO principals (email, user_type, user_id, password_hash, role, first_name, last_name, is_active)
+        SELECT email, %s, {key_column}, password_hash, {role}, first_name, last_name, {is_active}
+        FROM {table}
+        WHERE email IS NOT NULL AND password_hash IS NOT NULL
+        ON DUPLICATE KEY UPDATE
+            user_id = VALUES(user_id),
+            role = VALUES(role),
+            first_name = VALUES(first_name),
+            last_name = VALUES(last_name),
+            is_active = VALUES(is_active)
+        """, (user_type, default_role))
+        synced[table] = cursor.rowcount
+    return synced
+
+@migration('user sessions')
+def user_sessions(cursor):
+    ensure_table(cursor, 'user_sessions')
+
+@migration('principals')
+def principals_directory(cursor):
+    ensure_table(cursor, 'principals')
+    for trigger in ('customer_principal_after_update', 'customer_principal_after_delete',
+                    'employee_principal_after_update', 'employee_principal_after_delete'):
+        ensure_routine(cursor, 'TRIGGER', trigger)
+    # Backfill a new (or never populated) directory; afterwards sync_principals.py is run on demand
+    if not _scalar(cursor, "SELECT EXISTS(SELECT 1 FROM principals)", None):
+        sync_principals(cursor)
+
+def apply_migrations(connection):
+    """Run every migration step against the connection's database"""
+    cursor = connection.cursor()
+    try:
+        for name, step in MIGRATIONS:
+            step(cursor)
+            connection.commit()
+            print(f"   ✓ {name}")
+    finally:
+        cursor.close()
@@ -1,4 +1,12 @@
 -- Drop existing tables if they exist
+DROP TABLE IF EXISTS principals;
+DROP TABLE IF EXISTS session_revocations;
+DROP TABLE IF EXISTS user_sessions;
+DROP TABLE IF EXISTS stock_reservations;
+DROP TABLE IF EXISTS cart;
+DROP TABLE IF EXISTS sequences;
+DROP TABLE IF EXISTS customer_stats;
+DROP TABLE IF EXISTS daily_order_rollup;
 DROP TABLE IF EXISTS order_items;
 DROP TABLE IF EXISTS orders;
 DROP TABLE IF EXISTS banking_transactions;
@@ -78,7 +86,8 @@ CREATE TABLE suppliers (
     established_year YEAR,
     rating DECIMAL(3,2),
     payment_terms VARCHAR(100),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
 -- Create categories table
@@ -89,6 +98,7 @@ CREATE TABLE categories (
     description TEXT,
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (parent_category_id) REFERENCES categories(category_id)
 );
 
@@ -105,6 +115,7 @@ CREATE TABLE products (
     price DECIMAL(10,2) NOT NULL,
     cost_price DECIMAL(10,2),
     stock_quantity INT DEFAULT 0,
+    reserved_quantity INT DEFAULT 0, -- sum of active stock_reservations holds
     min_stock_level INT DEFAULT 10,
     max_stock_level INT DEFAULT 1000,
     weight DECIMAL(8,2),
@@ -120,7 +131,8 @@ CREATE TABLE products (
     INDEX idx_category (category_id),
     INDEX idx_brand (brand),
     INDEX idx_price (price),
-    INDEX idx_stock (stock_quantity)
+    INDEX idx_stock (stock_quantity),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- Create inventory logs table
@@ -154,7 +166,8 @@ CREATE TABLE product_reviews (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (product_id) REFERENCES products(product_id),
-    FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+    FOREIGN KEY (customer_id) REFERENCES customers(customer_id),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- Create banking accounts table
@@ -218,8 +231,12 @@ CREATE TABLE orders (
     FOREIGN KEY (store_id) REFERENCES stores(store_id),
     FOREIGN KEY (employee_id) REFERENCES employees(employee_id),
     INDEX idx_order_date (order_date),
-    INDEX idx_customer (customer_id),
-    INDEX idx_status (order_status)
+    INDEX idx_created_at (created_at),
+    -- Composite indexes for the common filtered/date-ordered access paths;
+    -- total_amount is included so the analytics aggregates are index-only
+    INDEX idx_status_date (order_status, order_date, total_amount),
+    INDEX idx_customer_date (customer_id, order_date, total_amount),
+    INDEX idx_payment_date (payment_method, order_date, total_amount)
 );
 
 -- Create order items table
@@ -236,6 +253,42 @@ CREATE TABLE order_items (
     FOREIGN KEY (product_id) REFERENCES products(product_id)
 );
 
+-- Create daily order rollup (maintained by the order_rollup_* triggers)
+-- Each key is spread over slot rows (CONNECTION_ID() % 8) so concurrent checkouts
+-- do not queue on one hot row; readers SUM across slots. A single slot may hold a
+-- negative count when an order is cancelled or deleted from another connection.
+CREATE TABLE daily_order_rollup (
+    rollup_date DATE NOT NULL,
+    order_status ENUM('PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED', 'RETURNED') NOT NULL,
+    payment_method ENUM('CASH', 'CREDIT_CARD', 'DEBIT_CARD', 'BANK_ACCOUNT', 'PAYPAL') NOT NULL,
+    store_id INT NOT NULL DEFAULT 0, -- 0 when the order has no store
+    slot TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    order_count INT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (rollup_date, order_status, payment_method, store_id, slot)
+);
+
+-- Create per-customer order statistics (maintained by the customer_stats_* triggers)
+CREATE TABLE customer_stats (
+    customer_id INT PRIMARY KEY,
+    order_count INT NOT NULL DEFAULT 0,
+    lifetime_value DECIMAL(14,2) NOT NULL DEFAULT 0, -- all orders except CANCELLED
+    delivered_count INT NOT NULL DEFAULT 0,
+    delivered_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    last_order_at TIMESTAMP NULL,
+    last_delivered_at TIMESTAMP NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE CASCADE
+);
+
+-- Create sequences table (order numbers and write-behind cart ids are handed out in blocks from here)
+CREATE TABLE sequences (
+    sequence_name VARCHAR(50) PRIMARY KEY,
+    next_value BIGINT NOT NULL DEFAULT 1
+);
+
+INSERT INTO sequences (sequence_name, next_value) VALUES ('order_number', 1), ('cart_id', 1);
+
 -- Create cart table for shopping cart functionality
 CREATE TABLE cart (
     cart_id INT PRIMARY KEY AUTO_INCREMENT,
@@ -249,6 +302,62 @@ CREATE TABLE cart (
     UNIQUE KEY unique_customer_product (customer_id, product_id)
 );
 
+-- Create stock reservations table (expiring holds taken on add-to-cart)
+CREATE TABLE stock_reservations (
+    reservation_id INT PRIMARY KEY AUTO_INCREMENT,
+    customer_id INT NOT NULL,
+    product_id INT NOT NULL,
+    quantity INT NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE CASCADE,
+    FOREIGN KEY (product_id) REFERENCES products(product_id) ON DELETE CASCADE,
+    UNIQUE KEY unique_reservation (customer_id, product_id),
+    INDEX idx_expires_at (expires_at)
+);
+
+-- Create user sessions table (expired rows are removed by the session reaper; the
+-- primary key includes expires_at so partition_user_sessions.py can partition by it)
+CREATE TABLE user_sessions (
+    session_id VARCHAR(255) NOT NULL,
+    user_type ENUM('customer', 'employee', 'admin') NOT NULL,
+    user_id INT NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (session_id, expires_at),
+    INDEX idx_expires_at (expires_at)
+);
+
+-- Create session revocations table (logouts broadcast to every worker's session cache;
+-- expires_at is set for signed session tokens, which stay revoked until they expire)
+CREATE TABLE session_revocations (
+    revocation_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    session_id VARCHAR(255) NOT NULL,
+    expires_at TIMESTAMP NULL DEFAULT NULL,
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_revoked_at (revoked_at),
+    INDEX idx_expires_at (expires_at)
+);
+
+-- Create principals table (login directory: one indexed lookup by email for every user type).
+-- Once a principal exists it owns the password hash; sync_principals.py only copies
+-- hashes from the user tables for new principals. Anything that creates a login user
+-- must insert its principal too (as register_user in routes/auth.py does) or run sync_principals.py.
+CREATE TABLE principals (
+    email VARCHAR(100) NOT NULL,
+    user_type ENUM('customer', 'employee', 'admin') NOT NULL,
+    user_id INT NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    role VARCHAR(50) NOT NULL,
+    first_name VARCHAR(50),
+    last_name VARCHAR(50),
+    is_active BOOLEAN DEFAULT TRUE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (email, user_type),
+    UNIQUE KEY unique_principal (user_type, user_id)
+);
+
 -- Create stored procedures and functions
 DELIMITER //
 
@@ -259,12 +368,36 @@ READS SQL DATA
 DETERMINISTIC
 BEGIN
     DECLARE total_value DECIMAL(12,2) DEFAULT 0;
-    SELECT COALESCE(SUM(total_amount), 0) INTO total_value
-    FROM orders 
-    WHERE customer_id = cust_id AND order_status != 'CANCELLED';
+    SELECT COALESCE(MAX(lifetime_value), 0) INTO total_value
+    FROM customer_stats
+    WHERE customer_id = cust_id;
     RETURN total_value;
 END //
 
+-- Procedure to recompute one customer's customer_stats row from orders
+-- (used by the triggers when a maximum may move backwards, e.g. on delete)
+CREATE PROCEDURE refresh_customer_stats(IN p_customer_id INT)
+BEGIN
+    INSERT INTO customer_stats (customer_id, order_count, lifetime_value, delivered_count, delivered_amount, last_order_at, last_delivered_at)
+    SELECT 
+        p_customer_id,
+        COUNT(*),
+        COALESCE(SUM(CASE WHEN order_status != 'CANCELLED' THEN total_amount END), 0),
+        COALESCE(SUM(order_status = 'DELIVERED'), 0),
+        COALESCE(SUM(CASE WHEN order_status = 'DELIVERED' THEN total_amount END), 0),
+        MAX(order_date),
+        MAX(CASE WHEN order_status = 'DELIVERED' THEN order_date END)
+    FROM orders
+    WHERE customer_id = p_customer_id
+    ON DUPLICATE KEY UPDATE
+        order_count = VALUES(order_count),
+        lifetime_value = VALUES(lifetime_value),
+        delivered_count = VALUES(delivered_count),
+        delivered_amount = VALUES(delivered_amount),
+        last_order_at = VALUES(last_order_at),
+        last_delivered_at = VALUES(last_delivered_at);
+END //
+
 -- Procedure to update product stock
 CREATE PROCEDURE update_product_stock(
     IN p_product_id INT,
@@ -340,11 +473,12 @@ DELIMITER ;
 DELIMITER //
 
 -- Trigger to update customer total spent
+-- (bulk status updates set @defer_customer_totals and apply one grouped update instead)
 CREATE TRIGGER update_customer_total_spent
 AFTER UPDATE ON orders
 FOR EACH ROW
 BEGIN
-    IF NEW.order_status = 'DELIVERED' AND OLD.order_status != 'DELIVERED' THEN
+    IF NEW.order_status = 'DELIVERED' AND OLD.order_status != 'DELIVERED' AND @defer_customer_totals IS NULL THEN
         UPDATE customers 
         SET total_spent = total_spent + NEW.total_amount,
             loyalty_points = loyalty_points + FLOOR(NEW.total_amount / 10)
@@ -352,6 +486,148 @@ BEGIN
     END IF;
 END //
 
+-- Triggers to keep daily_order_rollup in step with orders
+CREATE TRIGGER order_rollup_after_insert
+AFTER INSERT ON orders
+FOR EACH ROW
+BEGIN
+    INSERT INTO daily_order_rollup (rollup_date, order_status, payment_method, store_id, slot, order_count, total_amount)
+    VALUES (DATE(NEW.order_date), NEW.order_status, NEW.payment_method, COALESCE(NEW.store_id, 0), CONNECTION_ID() % 8, 1, NEW.total_amount)
+    ON DUPLICATE KEY UPDATE order_count = order_count + 1, total_amount = total_amount + NEW.total_amount;
+END //
+
+CREATE TRIGGER order_rollup_after_update
+AFTER UPDATE ON orders
+FOR EACH ROW
+BEGIN
+    IF NOT (DATE(OLD.order_date) <=> DATE(NEW.order_date)
+            AND OLD.order_status <=> NEW.order_status
+            AND OLD.payment_method <=> NEW.payment_method
+            AND OLD.store_id <=> NEW.store_id
+            AND OLD.total_amount <=> NEW.total_amount) THEN
+        INSERT INTO daily_order_rollup (rollup_date, order_status, payment_method, store_id, slot, order_count, total_amount)
+        VALUES (DATE(OLD.order_date), OLD.order_status, OLD.payment_method, COALESCE(OLD.store_id, 0), CONNECTION_ID() % 8, -1, -OLD.total_amount)
+        ON DUPLICATE KEY UPDATE order_count = order_count - 1, total_amount = total_amount - OLD.total_amount;
+
+        INSERT INTO daily_order_rollup (rollup_date, order_status, payment_method, store_id, slot, order_count, total_amount)
+        VALUES (DATE(NEW.order_date), NEW.order_status, NEW.payment_method, COALESCE(NEW.store_id, 0), CONNECTION_ID() % 8, 1, NEW.total_amount)
+        ON DUPLICATE KEY UPDATE order_count = order_count + 1, total_amount = total_amount + NEW.total_amount;
+    END IF;
+END //
+
+CREATE TRIGGER order_rollup_after_delete
+AFTER DELETE ON orders
+FOR EACH ROW
+BEGIN
+    INSERT INTO daily_order_rollup (rollup_date, order_status, payment_method, store_id, slot, order_count, total_amount)
+    VALUES (DATE(OLD.order_date), OLD.order_status, OLD.payment_method, COALESCE(OLD.store_id, 0), CONNECTION_ID() % 8, -1, -OLD.total_amount)
+    ON DUPLICATE KEY UPDATE order_count = order_count - 1, total_amount = total_amount - OLD.total_amount;
+END //
+
+-- Triggers to keep customer_stats in step with orders
+CREATE TRIGGER customer_stats_after_insert
+AFTER INSERT ON orders
+FOR EACH ROW
+BEGIN
+    IF NEW.customer_id IS NOT NULL THEN
+        INSERT INTO customer_stats (customer_id, order_count, lifetime_value, delivered_count, delivered_amount, last_order_at, last_delivered_at)
+        VALUES (
+            NEW.customer_id,
+            1,
+            IF(NEW.order_status != 'CANCELLED', NEW.total_amount, 0),
+            NEW.order_status = 'DELIVERED',
+            IF(NEW.order_status = 'DELIVERED', NEW.total_amount, 0),
+            NEW.order_date,
+            IF(NEW.order_status = 'DELIVERED', NEW.order_date, NULL)
+        )
+        ON DUPLICATE KEY UPDATE
+            order_count = order_count + 1,
+            lifetime_value = lifetime_value + VALUES(lifetime_value),
+            delivered_count = delivered_count + VALUES(delivered_count),
+            delivered_amount = delivered_amount + VALUES(delivered_amount),
+            last_order_at = GREATEST(COALESCE(last_order_at, VALUES(last_order_at)), VALUES(last_order_at)),
+            last_delivered_at = COALESCE(GREATEST(last_delivered_at, VALUES(last_delivered_at)), last_delivered_at, VALUES(last_delivered_at));
+    END IF;
+END //
+
+CREATE TRIGGER customer_stats_after_update
+AFTER UPDATE ON orders
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.customer_id <=> NEW.customer_id)
+            OR NOT (OLD.order_date <=> NEW.order_date)
+            OR (OLD.order_status = 'DELIVERED' AND NOT (NEW.order_status <=> 'DELIVERED')) THEN
+        -- last_order_at / last_delivered_at may move backwards, so recompute
+        IF OLD.customer_id IS NOT NULL THEN
+            CALL refresh_customer_stats(OLD.customer_id);
+        END IF;
+        IF NEW.customer_id IS NOT NULL AND NOT (OLD.customer_id <=> NEW.customer_id) THEN
+            CALL refresh_customer_stats(NEW.customer_id);
+        END IF;
+    ELSEIF NEW.customer_id IS NOT NULL
+            AND NOT (OLD.order_status <=> NEW.order_status AND OLD.total_amount <=> NEW.total_amount) THEN
+        UPDATE customer_stats
+        SET lifetime_value = lifetime_value
+                - IF(OLD.order_status != 'CANCELLED', OLD.total_amount, 0)
+                + IF(NEW.order_status != 'CANCELLED', NEW.total_amount, 0),
+            delivered_count = delivered_count - (OLD.order_status = 'DELIVERED') + (NEW.order_status = 'DELIVERED'),
+            delivered_amount = delivered_amount
+                - IF(OLD.order_status = 'DELIVERED', OLD.total_amount, 0)
+                + IF(NEW.order_status = 'DELIVERED', NEW.total_amount, 0),
+            last_delivered_at = IF(NEW.order_status = 'DELIVERED',
+                GREATEST(COALESCE(last_delivered_at, NEW.order_date), NEW.order_date), last_delivered_at)
+        WHERE customer_id = NEW.customer_id;
+    END IF;
+END //
+
+CREATE TRIGGER customer_stats_after_delete
+AFTER DELETE ON orders
+FOR EACH ROW
+BEGIN
+    IF OLD.customer_id IS NOT NULL THEN
+        CALL refresh_customer_stats(OLD.customer_id);
+    END IF;
+END //
+
+-- Triggers to keep principals in step with the customer and employee rows they log in as
+CREATE TRIGGER customer_principal_after_update
+AFTER UPDATE ON customers
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.email <=> NEW.email AND OLD.first_name <=> NEW.first_name
+            AND OLD.last_name <=> NEW.last_name AND OLD.is_active <=> NEW.is_active) THEN
+        UPDATE principals
+        SET email = NEW.email, first_name = NEW.first_name, last_name = NEW.last_name, is_active = NEW.is_active
+        WHERE user_type = 'customer' AND user_id = NEW.customer_id;
+    END IF;
+END //
+
+CREATE TRIGGER customer_principal_after_delete
+AFTER DELETE ON customers
+FOR EACH ROW
+BEGIN
+    DELETE FROM principals WHERE user_type = 'customer' AND user_id = OLD.customer_id;
+END //
+
+CREATE TRIGGER employee_principal_after_update
+AFTER UPDATE ON employees
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.email <=> NEW.email AND OLD.first_name <=> NEW.first_name
+            AND OLD.last_name <=> NEW.last_name AND OLD.is_active <=> NEW.is_active) THEN
+        UPDATE principals
+        SET email = NEW.email, first_name = NEW.first_name, last_name = NEW.last_name, is_active = NEW.is_active
+        WHERE user_type = 'employee' AND user_id = NEW.employee_id;
+    END IF;
+END //
+
+CREATE TRIGGER employee_principal_after_delete
+AFTER DELETE ON employees
+FOR EACH ROW
+BEGIN
+    DELETE FROM principals WHERE user_type = 'employee' AND user_id = OLD.employee_id;
+END //
+
 -- Trigger to log banking transactions
 CREATE TRIGGER after_banking_transaction
 AFTER INSERT ON banking_transactions
@@ -373,15 +649,18 @@ SELECT
     c.email,
     c.total_spent,
     c.loyalty_points,
-    COUNT(DISTINCT o.order_id) as total_orders,
-    COALESCE(AVG(o.total_amount), 0) as avg_order_value,
-    MAX(o.order_date) as last_order_date,
-    COALESCE(AVG(pr.rating), 0) as avg_rating_given,
+    COALESCE(cs.delivered_count, 0) as total_orders,
+    COALESCE(cs.delivered_amount / NULLIF(cs.delivered_count, 0), 0) as avg_order_value,
+    cs.last_delivered_at as last_order_date,
+    COALESCE(pr.avg_rating, 0) as avg_rating_given,
     DATEDIFF(CURDATE(), c.registration_date) as days_since_registration
 FROM customers c
-LEFT JOIN orders o ON c.customer_id = o.customer_id AND o.order_status = 'DELIVERED'
-LEFT JOIN product_reviews pr ON c.customer_id = pr.customer_id
-GROUP BY c.customer_id, c.first_name, c.last_name, c.email, c.total_spent, c.loyalty_points, c.registration_date;
+LEFT JOIN customer_stats cs ON c.customer_id = cs.customer_id
+LEFT JOIN (
+    SELECT customer_id, AVG(rating) as avg_rating
+    FROM product_reviews
+    GROUP BY customer_id
+) pr ON c.customer_id = pr.customer_id;
 
 CREATE VIEW product_performance AS
 SELECT 
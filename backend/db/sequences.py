@@ -0,0 +1,55 @@
+from db.db_config import DatabaseConfig
+import threading
+
+db = DatabaseConfig()
+
+class SequenceAllocator:
+    """Collision-free integers from sequence blocks reserved in the database.
+
+    Each process reserves block_size values at a time with one atomic UPDATE on
+    the sequences table and then hands them out from memory, so taking a value
+    needs no round trip and two processes never share a value. floor_query, if
+    given, is a scalar subquery the sequence is never allowed to fall below
+    (e.g. the highest id already present in the table it feeds).
+    """
+
+    def __init__(self, sequence_name, block_size, floor_query=None):
+        self.sequence_name = sequence_name
+        self.block_size = block_size
+        self.floor_query = floor_query
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        """Return the next value, reserving a new block when needed"""
+        with self._lock:
+            if self._next >= self._end:
+                self._allocate_block()
+            value = self._next
+            self._next += 1
+        return value
+
+    def _allocate_block(self):
+        connection = db.get_connection()
+        if not connection:
+            raise RuntimeError('Database connection failed')
+
+        current = f"GREATEST(next_value, ({self.floor_query}))" if self.floor_query else "next_value"
+        try:
+            cursor = connection.cursor(dictionary=True)
+            # LAST_INSERT_ID(expr) makes the new high-water mark readable on this connection
+            cursor.execute(
+                f"UPDATE sequences SET next_value = LAST_INSERT_ID({current} + %s) WHERE sequence_name = %s",
+                (self.block_size, self.sequence_name)
+            )
+            if cursor.rowcount == 0:
+                raise RuntimeError(f'Sequence {self.sequence_name} not found')
+            cursor.execute("SELECT LAST_INSERT_ID() as block_end")
+            block_end = cursor.fetchone()['block_end']
+        finally:
+            cursor.close()
+            connection.close()
+
+        self._next = block_end - self.block_size
+        self._end = block_end
@@ -17,5 +17,7 @@ fi
 
 echo "=== entrypoint: starting gunicorn ==="
 
-# Exec gunicorn so signals propagate correctly
-exec gunicorn --bind 0.0.0.0:${PORT:-5000} 'app:create_app()'
+# Exec gunicorn so signals propagate correctly. One process with threads:
+# logins wait on the bcrypt pool without blocking other requests, and the
+# in-process caches (write-behind carts, sessions) need a single process.
+exec gunicorn --bind 0.0.0.0:${PORT:-5000} --worker-class gthread --threads ${GUNICORN_THREADS:-16} 'app:create_app()'
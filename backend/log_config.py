@@ -0,0 +1,167 @@
+"""Logging setup for the Gadgets Store API.
+
+Records are written as one JSON object per line by a background thread
+(QueueHandler -> QueueListener), so a request never blocks on stdout.
+Environment:
+- LOG_LEVEL: minimum level (default INFO)
+- LOG_SAMPLE_RATES: per-endpoint sampling for records below WARNING,
+  e.g. "cart.get_cart=0.01,products.get_product_analytics=0.1"
+- LOG_PAYLOAD_LIMIT: max characters of a capped() payload (default 512)
+- LOG_MESSAGE_LIMIT: max characters of a formatted message (default 4096)
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+from flask import has_request_context, request
+
+LOGGER_NAME = 'gadgets'
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def parse_sample_rates(value):
+    """Parse "endpoint=rate,endpoint=rate" into {endpoint: rate}"""
+    rates = {}
+    for part in (value or '').split(','):
+        if '=' not in part:
+            continue
+        endpoint, rate = part.split('=', 1)
+        try:
+            rates[endpoint.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+class CappedPayload:
+    """Lazily rendered, length-limited stand-in for a logged payload.
+
+    The wrapped value is only converted to text if the record is emitted.
+    """
+
+    __slots__ = ('value', 'limit')
+
+    def __init__(self, value, limit=None):
+        self.value = value
+        self.limit = limit or int(os.getenv('LOG_PAYLOAD_LIMIT', 512))
+
+    def __str__(self):
+        text = self.value if isinstance(self.value, str) else repr(self.value)
+        if len(text) > self.limit:
+            return f"{text[:self.limit]}... [{len(text) - self.limit} more chars]"
+        return text
+
+    __repr__ = __str__
+
+
+def capped(value, limit=None):
+    """Wrap a payload for logging: rendered lazily and cut to LOG_PAYLOAD_LIMIT"""
+    return CappedPayload(value, limit)
+
+
+class EndpointSamplingFilter(logging.Filter):
+    """Keep only a sampled fraction of sub-WARNING records per Flask endpoint"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if has_request_context():
+            record.endpoint = request.endpoint
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(getattr(record, 'endpoint', None))
+        return rate is None or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; fields passed via extra={'fields': {...}} are merged in"""
+
+    def __init__(self, message_limit):
+        super().__init__()
+        self.message_limit = message_limit
+
+    def format(self, record):
+        message = record.getMessage()
+        if len(message) > self.message_limit:
+            message = f"{message[:self.message_limit]}... [truncated]"
+
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': message,
+        }
+        endpoint = getattr(record, 'endpoint', None)
+        if endpoint:
+            entry['endpoint'] = endpoint
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that renders accepted records on the calling thread (payloads
+    may change once the request moves on) and drops records when the queue is full"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def configure_logging():
+    """Install the queue handler on the 'gadgets' logger (idempotent)"""
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter(int(os.getenv('LOG_MESSAGE_LIMIT', 4096))))
+
+        log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', 10000)))
+        queue_handler = RequestQueueHandler(log_queue)
+        queue_handler.addFilter(EndpointSamplingFilter(parse_sample_rates(os.getenv('LOG_SAMPLE_RATES'))))
+
+        listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+        logger.addHandler(queue_handler)
+        logger.propagate = False
+        _configured = True
+
+
+def get_logger(name):
+    """Logger under the 'gadgets' hierarchy, configuring logging on first use"""
+    configure_logging()
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
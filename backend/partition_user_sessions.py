@@ -0,0 +1,63 @@
+"""Switch user_sessions to daily range partitions on expires_at.
+
+With the partitioned layout the session reaper drops whole expired days
+(ALTER TABLE ... DROP PARTITION) instead of deleting rows, and carves
+partitions for upcoming days out of the catch-all pmax partition:
+
+    python partition_user_sessions.py
+
+Partitions are created from the oldest unexpired session's day through
+SESSION_PARTITION_DAYS_AHEAD days from now (default 10, above the 7-day
+session lifetime). The table is rebuilt, so run it during a quiet period.
+"""
+
+import os
+from datetime import date, timedelta
+from db.db_config import DatabaseConfig
+from routes.session_reaper import partition_definition
+
+
+def partition_user_sessions():
+    db = DatabaseConfig()
+    conn = db.get_connection()
+    if not conn:
+        print("❌ Connection failed")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = 'user_sessions' AND partition_name IS NOT NULL
+        """)
+        if cursor.fetchone()[0]:
+            print("✓ user_sessions is already partitioned")
+            return True
+
+        # Rows that are already expired would otherwise need a partition of their own
+        cursor.execute("DELETE FROM user_sessions WHERE expires_at <= NOW()")
+        conn.commit()
+        print(f"   Deleted {cursor.rowcount} expired sessions")
+
+        days_ahead = int(os.getenv('SESSION_PARTITION_DAYS_AHEAD', 10))
+        days = [date.today() + timedelta(days=offset) for offset in range(days_ahead + 1)]
+        cursor.execute(f"""
+        ALTER TABLE user_sessions
+        PARTITION BY RANGE (UNIX_TIMESTAMP(expires_at)) (
+            {', '.join(partition_definition(day) for day in days)},
+            PARTITION pmax VALUES LESS THAN MAXVALUE
+        )
+        """)
+        print(f"✅ user_sessions partitioned into {len(days)} daily partitions plus pmax")
+        return True
+
+    except Exception as e:
+        print(f"Error partitioning user_sessions: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    partition_user_sessions()
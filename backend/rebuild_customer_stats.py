@@ -0,0 +1,42 @@
+"""Rebuild customer_stats from the orders table.
+
+customer_stats is normally maintained incrementally by the customer_stats_*
+triggers, and setup_database.py fills the table when it creates it on an
+existing database. Run this after bulk loads that bypassed the triggers, or
+whenever the counts are suspected to have drifted:
+
+    python rebuild_customer_stats.py
+
+The orders table is locked for writes while the statistics are recomputed so
+no order change is lost or counted twice.
+"""
+
+from db.db_config import DatabaseConfig
+from db import migrations
+
+
+def rebuild_customer_stats():
+    db = DatabaseConfig()
+    conn = db.get_connection()
+    if not conn:
+        print("❌ Connection failed")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        rows = migrations.rebuild_customer_stats(cursor)
+        conn.commit()
+        print(f"✅ customer_stats rebuilt: {rows} customers")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error rebuilding customer_stats: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    rebuild_customer_stats()
@@ -0,0 +1,39 @@
+"""Rebuild daily_order_rollup from the orders table.
+
+The rollup is normally maintained incrementally by the order_rollup_* triggers.
+Run this after bulk loads that bypassed the triggers, after restoring a backup,
+or whenever the rollup is suspected to have drifted:
+
+    python rebuild_order_rollup.py
+
+The orders table is locked for writes while the rollup is recomputed so no
+order change is lost or counted twice.
+"""
+
+from db.db_config import DatabaseConfig
+from db import migrations
+
+
+def rebuild_order_rollup():
+    db = DatabaseConfig()
+    conn = db.get_connection()
+    if not conn:
+        print("❌ Connection failed")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        rows = migrations.rebuild_order_rollup(cursor)
+        print(f"✅ daily_order_rollup rebuilt: {rows} rows")
+        return True
+
+    except Exception as e:
+        print(f"Error rebuilding daily_order_rollup: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    rebuild_order_rollup()
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request
 from db.db_config import DatabaseConfig
 from routes.auth import require_auth
+from routes.products import apply_stock_adjustments, product_analytics_snapshot
+from routes.cart_store import cart_summary_cache
 import json
 from datetime import datetime
 
@@ -111,6 +113,8 @@ def admin_update_product(product_id):
         result = db.execute_query(query, params)
         
         if result:
+            if 'price' in data or 'is_active' in data:
+                cart_summary_cache.invalidate_product(product_id)
             return jsonify({'message': 'Product updated successfully'}), 200
         else:
             return jsonify({'error': 'Product not found or update failed'}), 404
@@ -127,6 +131,7 @@ def admin_delete_product(product_id):
         result = db.execute_query(query, (product_id,))
         
         if result:
+            cart_summary_cache.invalidate_product(product_id)
             return jsonify({'message': 'Product deactivated successfully'}), 200
         else:
             return jsonify({'error': 'Product not found'}), 404
@@ -146,45 +151,23 @@ def admin_adjust_inventory():
             if field not in data:
                 return jsonify({'error': f'{field} is required'}), 400
         
-        product_id = data['product_id']
+        product_id = int(data['product_id'])
         quantity_change = int(data['quantity_change'])
         reason = data['reason']
+        transaction_type = 'IN' if quantity_change > 0 else 'OUT'
         
-        # Get current stock
-        current_stock_query = "SELECT stock_quantity FROM products WHERE product_id = %s"
-        current_stock_result = db.execute_query(current_stock_query, (product_id,), fetch=True)
-        
-        if not current_stock_result:
+        # Lock, update and log in one transaction
+        try:
+            result = apply_stock_adjustments([(product_id, quantity_change, transaction_type, reason)])[0]
+        except LookupError:
             return jsonify({'error': 'Product not found'}), 404
-        
-        current_stock = current_stock_result[0]['stock_quantity']
-        new_stock = current_stock + quantity_change
-        
-        if new_stock < 0:
+        except ValueError:
             return jsonify({'error': 'Insufficient stock for this adjustment'}), 400
         
-        # Update product stock
-        update_query = "UPDATE products SET stock_quantity = %s WHERE product_id = %s"
-        db.execute_query(update_query, (new_stock, product_id))
-        
-        # Log the inventory change
-        log_query = """
-        INSERT INTO inventory_logs (
-            product_id, transaction_type, quantity_change, 
-            previous_quantity, new_quantity, reason
-        ) VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        
-        transaction_type = 'IN' if quantity_change > 0 else 'OUT'
-        db.execute_query(log_query, (
-            product_id, transaction_type, quantity_change,
-            current_stock, new_stock, reason
-        ))
-        
         return jsonify({
             'message': 'Inventory adjusted successfully',
-            'previous_stock': current_stock,
-            'new_stock': new_stock
+            'previous_stock': result['previous_stock'],
+            'new_stock': result['new_stock']
         }), 200
         
     except Exception as e:
@@ -208,6 +191,7 @@ def admin_update_order_status(order_id):
         result = db.execute_query(query, (data['status'], order_id))
         
         if result:
+            product_analytics_snapshot.invalidate()
             return jsonify({'message': 'Order status updated successfully'}), 200
         else:
             return jsonify({'error': 'Order not found'}), 404
@@ -220,54 +204,62 @@ def admin_update_order_status(order_id):
 def admin_dashboard_analytics():
     """Get dashboard analytics (Admin/Manager only)"""
     try:
-        # Total products
-        total_products = db.execute_query(
-            "SELECT COUNT(*) as count FROM products WHERE is_active = TRUE",
-            fetch=True
-        )[0]['count']
-        
-        # Total customers
-        total_customers = db.execute_query(
-            "SELECT COUNT(*) as count FROM customers WHERE is_active = TRUE",
-            fetch=True
-        )[0]['count']
-        
-        # Total orders today
-        total_orders_today = db.execute_query(
-            "SELECT COUNT(*) as count FROM orders WHERE DATE(created_at) = CURDATE()",
-            fetch=True
-        )[0]['count']
-        
-        # Total revenue today
-        revenue_today = db.execute_query(
-            "SELECT COALESCE(SUM(total_amount), 0) as revenue FROM orders WHERE DATE(created_at) = CURDATE() AND payment_status = 'PAID'",
-            fetch=True
-        )[0]['revenue']
-        
-        # Low stock products
-        low_stock_products = db.execute_query(
-            """
-            SELECT p.product_name, p.stock_quantity, p.min_stock_level
-            FROM products p 
-            WHERE p.stock_quantity <= p.min_stock_level AND p.is_active = TRUE
-            ORDER BY p.stock_quantity ASC
-            LIMIT 10
-            """,
-            fetch=True
-        )
-        
-        # Recent orders
-        recent_orders = db.execute_query(
-            """
-            SELECT o.order_id, o.order_number, o.order_status, o.total_amount,
-                   c.first_name, c.last_name, o.created_at
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.customer_id
-            ORDER BY o.created_at DESC
-            LIMIT 10
-            """,
-            fetch=True
-        )
+        results = db.execute_parallel({
+            # Total products
+            'total_products': (
+                "SELECT COUNT(*) as count FROM products WHERE is_active = TRUE",
+                None
+            ),
+            # Total customers
+            'total_customers': (
+                "SELECT COUNT(*) as count FROM customers WHERE is_active = TRUE",
+                None
+            ),
+            # Total orders today
+            'total_orders_today': (
+                "SELECT COUNT(*) as count FROM orders WHERE created_at >= CURDATE() AND created_at < CURDATE() + INTERVAL 1 DAY",
+                None
+            ),
+            # Total revenue today
+            'revenue_today': (
+                "SELECT COALESCE(SUM(total_amount), 0) as revenue FROM orders WHERE created_at >= CURDATE() AND created_at < CURDATE() + INTERVAL 1 DAY AND payment_status = 'PAID'",
+                None
+            ),
+            # Low stock products
+            'low_stock_products': (
+                """
+                SELECT p.product_name, p.stock_quantity, p.min_stock_level
+                FROM products p 
+                WHERE p.stock_quantity <= p.min_stock_level AND p.is_active = TRUE
+                ORDER BY p.stock_quantity ASC
+                LIMIT 10
+                """,
+                None
+            ),
+            # Recent orders
+            'recent_orders': (
+                """
+                SELECT o.order_id, o.order_number, o.order_status, o.total_amount,
+                       c.first_name, c.last_name, o.created_at
+                FROM orders o
+                JOIN customers c ON o.customer_id = c.customer_id
+                ORDER BY o.created_at DESC
+                LIMIT 10
+                """,
+                None
+            )
+        })
+        
+        failed = [name for name, rows in results.items() if rows is None]
+        if failed:
+            return jsonify({'error': f'Failed to load dashboard data: {", ".join(failed)}'}), 500
+        
+        total_products = results['total_products'][0]['count']
+        total_customers = results['total_customers'][0]['count']
+        total_orders_today = results['total_orders_today'][0]['count']
+        revenue_today = results['revenue_today'][0]['revenue']
+        low_stock_products = results['low_stock_products']
+        recent_orders = results['recent_orders']
         
         return jsonify({
             'total_products': total_products,
@@ -1,10 +1,12 @@
 from flask import Blueprint, jsonify, request
 from db.db_config import DatabaseConfig
+from log_config import get_logger, capped
 import os
 import re
 
 ai_query_bp = Blueprint('ai_query', __name__)
 db = DatabaseConfig()
+logger = get_logger('ai_query')
 
 class TextToSQLConverter:
     def __init__(self):
@@ -17,10 +19,10 @@ class TextToSQLConverter:
         
         if self.hf_token and self.use_ai_model:
             self.api_url = "https://api-inference.huggingface.co/models/mrm8488/t5-base-finetuned-wikiSQL"
-            print("✅ HuggingFace API enabled (fallback mode)")
+            logger.info("HuggingFace API enabled (fallback mode)")
         else:
             self.api_url = None
-            print("ℹ️  Running in pattern-matching mode (recommended)")
+            logger.info("Running in pattern-matching mode")
         
         # Database schema information
         self.schema_info = self._get_schema_info()
@@ -62,16 +64,16 @@ class TextToSQLConverter:
         
         # If pattern failed and AI is enabled, try AI
         if self.use_ai_model and self.hf_token:
-            print(f"⚡ Pattern not found, trying AI for: {natural_query}")
+            logger.info("Pattern not found, trying AI for: %s", capped(natural_query))
             try:
                 ai_sql = self._try_huggingface_api(natural_query)
                 if ai_sql and self._validate_sql(ai_sql):
-                    print(f"✅ AI generated SQL successfully")
+                    logger.debug("AI generated SQL successfully")
                     return ai_sql
                 else:
-                    print(f"⚠️ AI generated invalid SQL, using fallback")
+                    logger.warning("AI generated invalid SQL, using fallback")
             except Exception as e:
-                print(f"❌ AI API failed: {e}")
+                logger.warning("AI API failed: %s", e)
         
         # Final fallback
         return self._create_fallback_query(natural_query)
@@ -246,10 +248,10 @@ SQL:"""
                     sql = self._extract_sql(generated_text, prompt)
                     return sql
             else:
-                print(f"API returned status {response.status_code}: {response.text}")
+                logger.warning("API returned status %s: %s", response.status_code, capped(response.text))
                 
         except Exception as e:
-            print(f"HuggingFace API error: {e}")
+            logger.warning("HuggingFace API error: %s", e)
         
         return None
     
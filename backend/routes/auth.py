@@ -1,31 +1,61 @@
 from flask import Blueprint, jsonify, request, session
 from db.db_config import DatabaseConfig
-import bcrypt
+from routes.session_cache import session_cache
+from routes.session_reaper import session_reaper
+from routes.session_tokens import load_session_token_signer
+from routes.passwords import password_hasher, login_throttle, PasswordQueueFull
+from routes.principals import USER_TABLES, find_principal, update_principal_hash, last_login_recorder
 import uuid
 from datetime import datetime, timedelta
 import re
 import functools
+import os
 
 auth_bp = Blueprint('auth', __name__)
 db = DatabaseConfig()
 
+SESSION_LIFETIME = timedelta(days=7)  # Session expires in 7 days
+
+# 'session' stores a UUID per login in user_sessions; 'signed' issues HMAC-signed
+# tokens verified without a database read (UUID sessions keep working in both modes,
+# signed tokens are only accepted in signed mode)
+SESSION_MODE = os.getenv('SESSION_MODE', 'session').lower()
+if SESSION_MODE not in ('session', 'signed'):
+    raise ValueError(f'Unknown SESSION_MODE: {SESSION_MODE}')
+session_token_signer = load_session_token_signer() if SESSION_MODE == 'signed' else None
+
 def validate_email(email):
     """Validate email format"""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
 def hash_password(password):
-    """Hash password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    """Hash password using bcrypt (on the password worker pool)"""
+    return password_hasher.hash(password)
 
 def check_password(password, hashed):
-    """Check password against hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    """Check password against hash (on the password worker pool)"""
+    return password_hasher.check(password, hashed)
+
+def rehash_password_if_needed(user_type, user_id, password, hashed):
+    """Upgrade a hash made with an old bcrypt cost after a successful login"""
+    if not password_hasher.needs_rehash(hashed):
+        return
+    try:
+        new_hash = hash_password(password)
+    except PasswordQueueFull:
+        return  # try again on a quieter login
+    update_principal_hash(user_type, user_id, new_hash)
 
 def create_session(user_type, user_id):
     """Create a new session"""
+    session_reaper.start()
+    if SESSION_MODE == 'signed':
+        token, _ = session_token_signer.issue(user_type, user_id, SESSION_LIFETIME.total_seconds())
+        return token
+
     session_id = str(uuid.uuid4())
-    expires_at = datetime.now() + timedelta(days=7)  # Session expires in 7 days
+    expires_at = datetime.now() + SESSION_LIFETIME
     
     query = """
     INSERT INTO user_sessions (session_id, user_type, user_id, expires_at)
@@ -35,18 +65,43 @@ def create_session(user_type, user_id):
     return session_id
 
 def validate_session(session_id):
-    """Validate and return session info"""
+    """Validate and return session info (served from the session cache when possible)"""
+    if session_token_signer and session_token_signer.is_token(session_id):
+        claims = session_token_signer.verify(session_id)
+        if not claims or session_cache.is_revoked(claims['jti']):
+            return None
+        return {'user_type': claims['typ'], 'user_id': claims['sub']}
+
+    session_info = session_cache.get(session_id)
+    if session_info is not None:
+        return session_info
+
+    looked_up_at = session_cache.lookup_started()
     query = """
-    SELECT user_type, user_id FROM user_sessions 
+    SELECT user_type, user_id, expires_at FROM user_sessions 
     WHERE session_id = %s AND expires_at > NOW()
     """
     result = db.execute_query(query, (session_id,), fetch=True)
-    return result[0] if result else None
+    if not result:
+        return None
+
+    session_info = {'user_type': result[0]['user_type'], 'user_id': result[0]['user_id']}
+    session_cache.put(session_id, session_info, result[0]['expires_at'], looked_up_at)
+    return session_info
 
 def delete_session(session_id):
-    """Delete a session"""
+    """Delete a session; raises if the logout could not be recorded"""
+    session_reaper.start()
+    if session_token_signer and session_token_signer.is_token(session_id):
+        claims = session_token_signer.verify(session_id, check_expiry=False)
+        if claims and claims['exp'] > datetime.now().timestamp():
+            session_cache.invalidate(claims['jti'], expires_at=datetime.fromtimestamp(claims['exp']))
+        return
+
     query = "DELETE FROM user_sessions WHERE session_id = %s"
-    db.execute_query(query, (session_id,))
+    if db.execute_query(query, (session_id,)) is None:
+        raise RuntimeError('Failed to delete session')
+    session_cache.invalidate(session_id)
 
 @auth_bp.route('/register', methods=['POST'])
 def register_user():
@@ -78,7 +133,10 @@ def register_user():
             return jsonify({'error': 'Email already registered'}), 409
         
         # Hash password
-        password_hash = hash_password(password)
+        try:
+            password_hash = hash_password(password)
+        except PasswordQueueFull:
+            return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
         
         # Insert new customer
         query = """
@@ -95,7 +153,27 @@ def register_user():
             data.get('gender'), password_hash, 'customer', True
         )
         
-        customer_id = db.execute_query(query, params)
+        # The customer row and its login principal are written together
+        connection = db.get_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+
+        cursor = connection.cursor(dictionary=True)
+        try:
+            connection.start_transaction()
+            cursor.execute(query, params)
+            customer_id = cursor.lastrowid
+            cursor.execute("""
+            INSERT INTO principals (email, user_type, user_id, password_hash, role, first_name, last_name)
+            VALUES (%s, 'customer', %s, %s, 'customer', %s, %s)
+            """, (data['email'], customer_id, password_hash, data['first_name'], data['last_name']))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            connection.close()
         
         if customer_id:
             # Create session
@@ -130,79 +208,37 @@ def login_user():
         email = data['email']
         password = data['password']
         user_type = data.get('user_type', 'customer')  # Default to customer
+        if user_type not in USER_TABLES:
+            user_type = 'customer'
         
-        user = None
-        user_id = None
-        user_info = {}
+        # Throttle per account and per client before any database or bcrypt work
+        # (remote_addr is the forwarded client address when PROXY_FIX_X_FOR is set)
+        allowed, retry_after = login_throttle.allow(account=email.lower(), ip=request.remote_addr)
+        if not allowed:
+            return jsonify({'error': 'Too many login attempts, please retry later'}), 429, {'Retry-After': str(retry_after)}
         
-        # Check different user types
-        if user_type == 'admin':
-            user = db.execute_query(
-                "SELECT admin_id, email, password_hash, first_name, last_name, role FROM admin_users WHERE email = %s AND is_active = TRUE",
-                (email,), fetch=True
-            )
-            if user:
-                user = user[0]
-                user_id = user['admin_id']
-                user_info = {
-                    'id': user_id,
-                    'email': user['email'],
-                    'first_name': user['first_name'],
-                    'last_name': user['last_name'],
-                    'role': user['role']
-                }
+        # One indexed read of the principal directory
+        user = find_principal(email, user_type)
         
-        elif user_type == 'employee':
-            user = db.execute_query(
-                "SELECT employee_id, email, password_hash, first_name, last_name, role FROM employees WHERE email = %s AND is_active = TRUE",
-                (email,), fetch=True
-            )
-            if user:
-                user = user[0]
-                user_id = user['employee_id']
-                user_info = {
-                    'id': user_id,
-                    'email': user['email'],
-                    'first_name': user['first_name'],
-                    'last_name': user['last_name'],
-                    'role': user['role']
-                }
+        try:
+            if not user or not check_password(password, user['password_hash']):
+                return jsonify({'error': 'Invalid email or password'}), 401
+        except PasswordQueueFull:
+            return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
         
-        else:  # customer
-            user = db.execute_query(
-                "SELECT customer_id, email, password_hash, first_name, last_name, role FROM customers WHERE email = %s AND is_active = TRUE",
-                (email,), fetch=True
-            )
-            if user:
-                user = user[0]
-                user_id = user['customer_id']
-                user_info = {
-                    'id': user_id,
-                    'email': user['email'],
-                    'first_name': user['first_name'],
-                    'last_name': user['last_name'],
-                    'role': user['role']
-                }
+        user_id = user['user_id']
+        user_info = {
+            'id': user_id,
+            'email': user['email'],
+            'first_name': user['first_name'],
+            'last_name': user['last_name'],
+            'role': user['role']
+        }
         
-        if not user or not check_password(password, user['password_hash']):
-            return jsonify({'error': 'Invalid email or password'}), 401
+        rehash_password_if_needed(user_type, user_id, password, user['password_hash'])
         
-        # Update last login
-        if user_type == 'admin':
-            db.execute_query(
-                "UPDATE admin_users SET last_login = NOW() WHERE admin_id = %s",
-                (user_id,)
-            )
-        elif user_type == 'employee':
-            db.execute_query(
-                "UPDATE employees SET last_login = NOW() WHERE employee_id = %s",
-                (user_id,)
-            )
-        else:
-            db.execute_query(
-                "UPDATE customers SET last_login = NOW() WHERE customer_id = %s",
-                (user_id,)
-            )
+        # Update last login (written in batches in the background)
+        last_login_recorder.record(user_type, user_id)
         
         # Create session
         session_id = create_session(user_type, user_id)
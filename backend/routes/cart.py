@@ -1,136 +1,170 @@
 from flask import Blueprint, jsonify, request
 from db.db_config import DatabaseConfig
+from routes.products import product_analytics_snapshot, lock_products, write_stock_levels, insert_inventory_logs
+from routes.orders import TAX_RATE, generate_order_number
+from routes.reservations import reservation_ledger
+from routes.cart_store import cart_store, cart_summary_cache
+from log_config import get_logger, capped
 import json
-from datetime import datetime
+from decimal import Decimal
 
 cart_bp = Blueprint('cart', __name__)
 db = DatabaseConfig()
+logger = get_logger('cart')
+
+def cart_summary(item_count, subtotal):
+    """Summary block for cart responses, exact to the cent"""
+    subtotal = Decimal(subtotal).quantize(Decimal('0.01'))
+    tax_amount = (subtotal * TAX_RATE).quantize(Decimal('0.01'))
+    return {
+        'item_count': item_count,
+        'subtotal': subtotal,
+        'tax_amount': tax_amount,
+        'total_amount': subtotal + tax_amount
+    }
 
 @cart_bp.route('/<int:customer_id>', methods=['GET'])
 def get_cart(customer_id):
     try:
-        print(f"Getting cart for customer: {customer_id}")
-        query = """
-        SELECT 
-            c.cart_id,
-            c.customer_id,
-            c.product_id,
-            c.quantity,
-            c.added_at,
-            p.product_name,
-            p.brand,
-            p.price,
-            p.stock_quantity,
-            p.warranty_period,
-            cat.category_name,
-            (c.quantity * p.price) as total_price
-        FROM cart c
-        JOIN products p ON c.product_id = p.product_id
-        LEFT JOIN categories cat ON p.category_id = cat.category_id
-        WHERE c.customer_id = %s AND p.is_active = TRUE
-        ORDER BY c.added_at DESC
-        """
+        cart_items = cart_store.lines(customer_id)
+        if cart_items is None:
+            return jsonify({'error': 'Failed to load cart'}), 500
+
+        # Reading the full cart also refreshes the cached summary
+        item_count, subtotal = cart_summary_cache.store(customer_id, [
+            {'product_id': item['product_id'], 'quantity': item['quantity'], 'price': item['price']}
+            for item in cart_items
+        ])
         
-        print(f"Executing cart query for customer {customer_id}")
-        cart_items = db.execute_query(query, (customer_id,), fetch=True)
-        print(f"Cart items found: {cart_items}")
-        
-        # Calculate totals
-        subtotal = sum(float(item['total_price']) for item in cart_items) if cart_items else 0
-        tax_rate = 0.08  # 8% tax
-        tax_amount = subtotal * tax_rate
-        total_amount = subtotal + tax_amount
-        
-        result = {
+        return jsonify({
             'cart_items': cart_items,
-            'summary': {
-                'item_count': len(cart_items),
-                'subtotal': round(subtotal, 2),
-                'tax_amount': round(tax_amount, 2),
-                'total_amount': round(total_amount, 2)
-            }
-        }
-        print(f"Cart result: {result}")
-        
-        return jsonify(result)
+            'summary': cart_summary(item_count, subtotal)
+        })
 
     except Exception as e:
-        print(f"Error getting cart: {str(e)}")
+        logger.exception("Error getting cart for customer %s", customer_id)
         return jsonify({'error': str(e)}), 500
 
+@cart_bp.route('/<int:customer_id>/summary', methods=['GET'])
+def get_cart_summary(customer_id):
+    try:
+        cached = cart_summary_cache.get(customer_id)
+        if cached is None:
+            lines = cart_store.priced_lines(customer_id)
+            if lines is None:
+                return jsonify({'error': 'Failed to load cart'}), 500
+            cached = cart_summary_cache.store(customer_id, lines)
+
+        return jsonify({'summary': cart_summary(*cached)})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def add_items_to_cart(customer_id, quantities):
+    """Hold stock for and add {product_id: quantity} to a cart; returns (added, rejected)"""
+    granted = reservation_ledger.reserve_many(customer_id, quantities, increment=True)
+    held = {product_id: quantity for product_id, quantity in quantities.items() if product_id in granted}
+    rejected = {product_id: 'Insufficient stock' for product_id in quantities if product_id not in granted}
+
+    if rejected:
+        # Only failed holds pay for telling a missing product from a short one
+        missing = list(rejected)
+        active = db.execute_query(
+            f"SELECT product_id FROM products WHERE product_id IN ({', '.join(['%s'] * len(missing))}) AND is_active = TRUE",
+            missing, fetch=True
+        ) or []
+        active_ids = {row['product_id'] for row in active}
+        for product_id in missing:
+            if product_id not in active_ids:
+                rejected[product_id] = 'Product not found'
+
+    if held:
+        written = set(cart_store.add(customer_id, held))
+        refused = {product_id: -held.pop(product_id) for product_id in list(held) if product_id not in written}
+        if refused:
+            # The stock guard in the upsert refused these lines: give their holds back
+            reservation_ledger.reserve_many(customer_id, refused, increment=True)
+            for product_id in refused:
+                rejected[product_id] = 'Not enough stock for this quantity'
+
+    for product_id, quantity in held.items():
+        cart_summary_cache.add_quantity(customer_id, product_id, quantity)
+
+    return held, rejected
+
 @cart_bp.route('/add', methods=['POST'])
 def add_to_cart():
     try:
-        data = request.get_json()
-        print(f"Cart add request data: {data}")
+        data = request.get_json(silent=True)
+        logger.debug("Cart add request data: %s", capped(data))
+
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
         
         # Validate required fields
         required_fields = ['customer_id', 'product_id', 'quantity']
         for field in required_fields:
             if field not in data:
-                print(f"Missing field: {field}")
                 return jsonify({'error': f'Missing required field: {field}'}), 400
 
         customer_id = data['customer_id']
-        product_id = data['product_id']
+        product_id = int(data['product_id'])
         quantity = int(data['quantity'])
 
-        print(f"Adding to cart: customer={customer_id}, product={product_id}, quantity={quantity}")
+        logger.debug("Adding to cart: customer=%s, product=%s, quantity=%s", customer_id, product_id, quantity)
 
         if quantity <= 0:
             return jsonify({'error': 'Quantity must be greater than 0'}), 400
 
-        # Check if product exists and has enough stock
-        product_query = """
-        SELECT product_id, product_name, price, stock_quantity 
-        FROM products 
-        WHERE product_id = %s AND is_active = TRUE
-        """
-        product = db.execute_query(product_query, (product_id,), fetch=True)
-        print(f"Product found: {product}")
-        
-        if not product:
-            return jsonify({'error': 'Product not found'}), 404
-        
-        if product[0]['stock_quantity'] < quantity:
-            return jsonify({'error': 'Insufficient stock'}), 400
-
-        # Check if item already exists in cart
-        existing_query = """
-        SELECT cart_id, quantity 
-        FROM cart 
-        WHERE customer_id = %s AND product_id = %s
-        """
-        existing_item = db.execute_query(existing_query, (customer_id, product_id), fetch=True)
-        print(f"Existing cart item: {existing_item}")
-
-        if existing_item:
-            # Update existing item
-            new_quantity = existing_item[0]['quantity'] + quantity
-            
-            if product[0]['stock_quantity'] < new_quantity:
-                return jsonify({'error': 'Not enough stock for this quantity'}), 400
-            
-            update_query = """
-            UPDATE cart 
-            SET quantity = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE cart_id = %s
-            """
-            result = db.execute_query(update_query, (new_quantity, existing_item[0]['cart_id']))
-            print(f"Updated cart item, result: {result}")
-        else:
-            # Add new item
-            insert_query = """
-            INSERT INTO cart (customer_id, product_id, quantity)
-            VALUES (%s, %s, %s)
-            """
-            result = db.execute_query(insert_query, (customer_id, product_id, quantity))
-            print(f"Inserted new cart item, result: {result}")
+        added, rejected = add_items_to_cart(customer_id, {product_id: quantity})
+        if product_id in rejected:
+            status = 404 if rejected[product_id] == 'Product not found' else 400
+            return jsonify({'error': rejected[product_id]}), status
 
         return jsonify({'message': 'Item added to cart successfully'})
 
     except Exception as e:
-        print(f"Cart add error: {str(e)}")
+        logger.exception("Cart add error")
+        return jsonify({'error': str(e)}), 500
+
+@cart_bp.route('/add-many', methods=['POST'])
+def add_many_to_cart():
+    try:
+        data = request.get_json(silent=True)
+
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+
+        for field in ['customer_id', 'items']:
+            if field not in data:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+
+        if not isinstance(data['items'], list) or not data['items']:
+            return jsonify({'error': 'items must be a non-empty list'}), 400
+
+        # Merge repeated products so each cart line is written once
+        quantities = {}
+        for item in data['items']:
+            if not isinstance(item, dict) or 'product_id' not in item or 'quantity' not in item:
+                return jsonify({'error': 'Each item needs product_id and quantity'}), 400
+            quantity = int(item['quantity'])
+            if quantity <= 0:
+                return jsonify({'error': 'Quantity must be greater than 0'}), 400
+            product_id = int(item['product_id'])
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        added, rejected = add_items_to_cart(data['customer_id'], quantities)
+
+        result = {
+            'message': f'{len(added)} item(s) added to cart',
+            'added': [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in added.items()],
+            'rejected': [{'product_id': product_id, 'error': error} for product_id, error in rejected.items()]
+        }
+        return jsonify(result), 200 if added else 400
+
+    except (ValueError, TypeError):
+        return jsonify({'error': 'product_id and quantity must be integers'}), 400
+    except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @cart_bp.route('/update/<int:cart_id>', methods=['PUT'])
@@ -146,28 +180,17 @@ def update_cart_item(cart_id):
         if quantity <= 0:
             return jsonify({'error': 'Quantity must be greater than 0'}), 400
 
-        # Get cart item and check stock
-        cart_query = """
-        SELECT c.cart_id, c.product_id, p.stock_quantity
-        FROM cart c
-        JOIN products p ON c.product_id = p.product_id
-        WHERE c.cart_id = %s
-        """
-        cart_item = db.execute_query(cart_query, (cart_id,), fetch=True)
+        cart_item = cart_store.line(cart_id)
         
         if not cart_item:
             return jsonify({'error': 'Cart item not found'}), 404
-        
-        if cart_item[0]['stock_quantity'] < quantity:
+
+        # The hold is only taken if enough unreserved stock is left
+        if not reservation_ledger.reserve(cart_item['customer_id'], cart_item['product_id'], quantity):
             return jsonify({'error': 'Insufficient stock'}), 400
 
-        # Update quantity
-        update_query = """
-        UPDATE cart 
-        SET quantity = %s, updated_at = CURRENT_TIMESTAMP
-        WHERE cart_id = %s
-        """
-        db.execute_query(update_query, (quantity, cart_id))
+        cart_store.set_quantity(cart_item['customer_id'], cart_item['product_id'], quantity)
+        cart_summary_cache.set_quantity(cart_item['customer_id'], cart_item['product_id'], quantity)
 
         return jsonify({'message': 'Cart item updated successfully'})
 
@@ -177,39 +200,51 @@ def update_cart_item(cart_id):
 @cart_bp.route('/remove/<int:cart_id>', methods=['DELETE'])
 def remove_cart_item(cart_id):
     try:
-        query = "DELETE FROM cart WHERE cart_id = %s"
-        result = db.execute_query(query, (cart_id,))
+        cart_item = cart_store.line(cart_id)
         
-        if result is not None:
-            return jsonify({'message': 'Item removed from cart successfully'})
-        else:
+        if not cart_item or not cart_store.remove(cart_id):
             return jsonify({'error': 'Cart item not found'}), 404
 
+        cart_summary_cache.set_quantity(cart_item['customer_id'], cart_item['product_id'], 0)
+        reservation_ledger.release(cart_item['customer_id'], [cart_item['product_id']])
+        return jsonify({'message': 'Item removed from cart successfully'})
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @cart_bp.route('/clear/<int:customer_id>', methods=['DELETE'])
 def clear_cart(customer_id):
     try:
-        query = "DELETE FROM cart WHERE customer_id = %s"
-        db.execute_query(query, (customer_id,))
+        cart_store.clear(customer_id)
+        cart_summary_cache.store(customer_id, [])
+        reservation_ledger.release(customer_id)
         
         return jsonify({'message': 'Cart cleared successfully'})
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@cart_bp.route('/availability/<int:product_id>', methods=['GET'])
+def get_availability(product_id):
+    try:
+        return jsonify({
+            'product_id': product_id,
+            'available': reservation_ledger.available(product_id)
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @cart_bp.route('/checkout', methods=['POST'])
 def checkout():
     try:
         data = request.get_json()
-        print(f"Checkout request data: {data}")
+        logger.debug("Checkout request data: %s", capped(data))
         
         # Validate required fields
         required_fields = ['customer_id', 'payment_method', 'shipping_address']
         for field in required_fields:
             if field not in data:
-                print(f"Missing field: {field}")
                 return jsonify({'error': f'Missing required field: {field}'}), 400
 
         customer_id = data['customer_id']
@@ -218,97 +253,126 @@ def checkout():
         store_id = data.get('store_id', 1)  # Default store
         employee_id = data.get('employee_id', 1)  # Default employee
 
-        print(f"Checkout for customer {customer_id}")
-
-        # Get cart items
-        cart_query = """
-        SELECT 
-            c.cart_id,
-            c.product_id,
-            c.quantity,
-            p.product_name,
-            p.price,
-            p.stock_quantity,
-            (c.quantity * p.price) as total_price
-        FROM cart c
-        JOIN products p ON c.product_id = p.product_id
-        WHERE c.customer_id = %s AND p.is_active = TRUE
-        """
-        cart_items = db.execute_query(cart_query, (customer_id,), fetch=True)
-        print(f"Cart items for checkout: {cart_items}")
-        
-        if not cart_items:
-            return jsonify({'error': 'Cart is empty'}), 400
-
-        # Check stock availability
-        for item in cart_items:
-            if item['stock_quantity'] < item['quantity']:
-                return jsonify({
-                    'error': f'Insufficient stock for {item["product_name"]}. Available: {item["stock_quantity"]}'
-                }), 400
-
-        # Calculate totals
-        subtotal = sum(float(item['total_price']) for item in cart_items)
-        tax_rate = 0.08  # 8% tax
-        tax_amount = subtotal * tax_rate
-        total_amount = subtotal + tax_amount
-
-        print(f"Order totals: subtotal={subtotal}, tax={tax_amount}, total={total_amount}")
-
-        # Generate order number
-        order_number = f"ORD-{datetime.now().strftime('%Y%m%d')}-{customer_id}-{int(datetime.now().timestamp())}"
-        print(f"Generated order number: {order_number}")
-
-        # Create order
-        order_query = """
-        INSERT INTO orders (
-            customer_id, store_id, employee_id, order_number, 
-            payment_method, subtotal, tax_amount, total_amount, 
-            shipping_address, order_status, payment_status
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'PENDING', 'PENDING')
-        """
-        order_params = (
-            customer_id, store_id, employee_id, order_number,
-            payment_method, subtotal, tax_amount, total_amount, shipping_address
-        )
-        
-        print(f"Creating order with params: {order_params}")
-        order_id = db.execute_query(order_query, order_params)
-        print(f"Order created with ID: {order_id}")
-
-        # Create order items and update stock
-        for item in cart_items:
-            print(f"Processing cart item: {item}")
-            # Insert order item
-            order_item_query = """
-            INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price)
-            VALUES (%s, %s, %s, %s, %s)
+        # Pending in-memory cart changes must be in the cart table before it is
+        # read, and must not be flushed back once the cart rows are deleted
+        cart_store.begin_checkout(customer_id)
+
+        connection = db.get_connection()
+        if not connection:
+            cart_store.end_checkout(customer_id)
+            return jsonify({'error': 'Database connection failed'}), 500
+
+        # Everything below runs as one transaction on one connection
+        try:
+            cursor = connection.cursor(dictionary=True)
+            connection.start_transaction()
+
+            # Get cart items
+            cart_query = """
+            SELECT c.cart_id, c.product_id, c.quantity
+            FROM cart c
+            WHERE c.customer_id = %s
+            FOR UPDATE
             """
-            db.execute_query(order_item_query, (
-                order_id, item['product_id'], item['quantity'], 
-                item['price'], item['total_price']
-            ))
+            cursor.execute(cart_query, (customer_id,))
+            cart_rows = cursor.fetchall()
 
-            # Update product stock using stored procedure
-            stock_update_query = "CALL update_product_stock(%s, %s, %s, %s, %s)"
-            db.execute_query(stock_update_query, (
-                item['product_id'], -item['quantity'], 'OUT', 
-                employee_id, f'Sale - Order {order_number}'
-            ))
+            # Convert this customer's holds first (reservations before products,
+            # the same lock order as reserve()); held units return to the pool
+            # and are then taken below together with the rest of the order
+            reservation_ledger.consume(cursor, customer_id)
 
-        # Clear cart
-        clear_cart_query = "DELETE FROM cart WHERE customer_id = %s"
-        db.execute_query(clear_cart_query, (customer_id,))
-        print(f"Cart cleared for customer {customer_id}")
+            # Lock the products in primary-key order and drop inactive ones
+            products = lock_products(cursor, [row['product_id'] for row in cart_rows], active_only=True) if cart_rows else {}
+            cart_items = [row for row in cart_rows if row['product_id'] in products]
+            
+            if not cart_items:
+                connection.rollback()
+                return jsonify({'error': 'Cart is empty'}), 400
+
+            # Check stock availability
+            for item in cart_items:
+                product = products[item['product_id']]
+                available = product['stock_quantity'] - product['reserved_quantity']
+                if available < item['quantity']:
+                    connection.rollback()
+                    return jsonify({
+                        'error': f'Insufficient stock for {product["product_name"]}. Available: {available}'
+                    }), 400
+
+            # Calculate totals
+            subtotal = sum(products[item['product_id']]['price'] * item['quantity'] for item in cart_items)
+            tax_amount = (subtotal * TAX_RATE).quantize(Decimal('0.01'))
+            total_amount = subtotal + tax_amount
+
+            # Generate order number
+            order_number = generate_order_number()
+
+            # Create order (payment is captured as part of this transaction)
+            order_query = """
+            INSERT INTO orders (
+                customer_id, store_id, employee_id, order_number, 
+                payment_method, subtotal, tax_amount, total_amount, 
+                shipping_address, order_status, payment_status
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'PROCESSING', 'PAID')
+            """
+            cursor.execute(order_query, (
+                customer_id, store_id, employee_id, order_number,
+                payment_method, subtotal, tax_amount, total_amount, shipping_address
+            ))
+            order_id = cursor.lastrowid
 
-        # Update order status to processing
-        update_order_query = """
-        UPDATE orders 
-        SET order_status = 'PROCESSING', payment_status = 'PAID'
-        WHERE order_id = %s
-        """
-        db.execute_query(update_order_query, (order_id,))
-        print(f"Order {order_id} status updated to PROCESSING")
+            # Create order items with one multi-row insert
+            cursor.executemany("""
+            INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price)
+            VALUES (%s, %s, %s, %s, %s)
+            """, [
+                (
+                    order_id, item['product_id'], item['quantity'],
+                    products[item['product_id']]['price'],
+                    products[item['product_id']]['price'] * item['quantity']
+                )
+                for item in cart_items
+            ])
+
+            # Decrement stock with one UPDATE ... CASE and log every change
+            new_stock = {
+                item['product_id']: products[item['product_id']]['stock_quantity'] - item['quantity']
+                for item in cart_items
+            }
+            write_stock_levels(cursor, new_stock)
+            insert_inventory_logs(cursor, [
+                (
+                    item['product_id'], 'OUT', -item['quantity'],
+                    products[item['product_id']]['stock_quantity'], new_stock[item['product_id']],
+                    f'Sale - Order {order_number}', order_id, employee_id
+                )
+                for item in cart_items
+            ])
+
+            # Clear cart
+            cursor.execute("DELETE FROM cart WHERE customer_id = %s", (customer_id,))
+
+            connection.commit()
+            cart_store.discard(customer_id)
+            cart_summary_cache.store(customer_id, [])
+            logger.info(
+                "Order %s placed for customer %s", order_id, customer_id,
+                extra={'fields': {'order_number': order_number, 'total_amount': total_amount, 'line_count': len(cart_items)}}
+            )
+
+            for product_id in new_stock:
+                reservation_ledger.invalidate(product_id)
+
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            connection.close()
+            cart_store.end_checkout(customer_id)
+
+        product_analytics_snapshot.invalidate()
 
         return jsonify({
             'message': 'Order placed successfully',
@@ -318,5 +382,5 @@ def checkout():
         }), 201
 
     except Exception as e:
-        print(f"Checkout error: {str(e)}")
+        logger.exception("Checkout error")
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,557 @@
+from db.db_config import DatabaseConfig
+from db.sequences import SequenceAllocator
+from log_config import get_logger
+from mysql.connector import Error, errorcode
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+import atexit
+import os
+import threading
+import time
+
+db = DatabaseConfig()
+logger = get_logger('cart_store')
+
+CART_ADD_ATTEMPTS = 3
+RETRYABLE_LOCK_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+CART_PRODUCT_COLUMNS = """
+    p.product_name,
+    p.brand,
+    p.price,
+    p.stock_quantity,
+    p.warranty_period,
+    cat.category_name
+"""
+
+class MySQLCartStore:
+    """Cart lines read and written straight through to the cart table."""
+
+    def lines(self, customer_id):
+        """Cart lines joined with their (active) products, newest first"""
+        query = f"""
+        SELECT
+            c.cart_id,
+            c.customer_id,
+            c.product_id,
+            c.quantity,
+            c.added_at,
+            {CART_PRODUCT_COLUMNS},
+            (c.quantity * p.price) as total_price
+        FROM cart c
+        JOIN products p ON c.product_id = p.product_id
+        LEFT JOIN categories cat ON p.category_id = cat.category_id
+        WHERE c.customer_id = %s AND p.is_active = TRUE
+        ORDER BY c.added_at DESC
+        """
+        return db.execute_query(query, (customer_id,), fetch=True)
+
+    def priced_lines(self, customer_id):
+        """[{product_id, quantity, price}] for the cart's active products (no category join)"""
+        query = """
+        SELECT c.product_id, c.quantity, p.price
+        FROM cart c
+        JOIN products p ON c.product_id = p.product_id
+        WHERE c.customer_id = %s AND p.is_active = TRUE
+        """
+        return db.execute_query(query, (customer_id,), fetch=True)
+
+    def line(self, cart_id):
+        """Return {cart_id, customer_id, product_id, quantity} or None"""
+        result = db.execute_query(
+            "SELECT cart_id, customer_id, product_id, quantity FROM cart WHERE cart_id = %s",
+            (cart_id,), fetch=True
+        )
+        return result[0] if result else None
+
+    def add(self, customer_id, quantities):
+        """Add quantities ({product_id: quantity}) to the customer's cart in one statement.
+
+        Lines are inserted or incremented with INSERT ... ON DUPLICATE KEY UPDATE
+        and a line is skipped if the product is inactive or the resulting cart
+        quantity would exceed its stock. The lines are read without locks before
+        and after the upsert; both reads use the transaction's snapshot, so a line
+        that changed between them was written by this statement. Returns the
+        product ids written.
+        """
+        product_ids = sorted(quantities)
+        requested = " UNION ALL ".join(["SELECT %s AS product_id, %s AS quantity"] * len(product_ids))
+        params = [customer_id]
+        for product_id in product_ids:
+            params.extend([product_id, quantities[product_id]])
+        params.append(customer_id)
+
+        lines_query = f"""
+        SELECT product_id, quantity FROM cart
+        WHERE customer_id = %s AND product_id IN ({', '.join(['%s'] * len(product_ids))})
+        """
+        query = f"""
+        INSERT INTO cart (customer_id, product_id, quantity)
+        SELECT %s, p.product_id, r.quantity
+        FROM ({requested}) r
+        JOIN products p ON p.product_id = r.product_id AND p.is_active = TRUE
+        LEFT JOIN cart c ON c.customer_id = %s AND c.product_id = r.product_id
+        WHERE p.stock_quantity >= COALESCE(c.quantity, 0) + r.quantity
+        ON DUPLICATE KEY UPDATE quantity = cart.quantity + VALUES(quantity), updated_at = CURRENT_TIMESTAMP
+        """
+
+        for attempt in range(1, CART_ADD_ATTEMPTS + 1):
+            connection = db.get_connection()
+            if not connection:
+                raise RuntimeError('Failed to update cart')
+            cursor = connection.cursor(dictionary=True)
+            try:
+                connection.start_transaction()
+                cursor.execute(lines_query, [customer_id] + product_ids)
+                before = {row['product_id']: row['quantity'] for row in cursor.fetchall()}
+                cursor.execute(query, params)
+                cursor.execute(lines_query, [customer_id] + product_ids)
+                after = {row['product_id']: row['quantity'] for row in cursor.fetchall()}
+                connection.commit()
+                break
+            except Error as e:
+                connection.rollback()
+                # Concurrent adds to the same cart can still meet on the upsert's gap locks
+                if e.errno not in RETRYABLE_LOCK_ERRORS or attempt == CART_ADD_ATTEMPTS:
+                    raise
+                logger.warning("Cart add for customer %s hit %s, retrying", customer_id, e.errno)
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+                connection.close()
+
+        return [product_id for product_id in product_ids if after.get(product_id) != before.get(product_id)]
+
+    def set_quantity(self, customer_id, product_id, quantity):
+        query = """
+        INSERT INTO cart (customer_id, product_id, quantity)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE quantity = VALUES(quantity), updated_at = CURRENT_TIMESTAMP
+        """
+        if db.execute_query(query, (customer_id, product_id, quantity)) is None:
+            raise RuntimeError('Failed to update cart')
+
+    def remove(self, cart_id):
+        return bool(db.execute_query("DELETE FROM cart WHERE cart_id = %s", (cart_id,)))
+
+    def clear(self, customer_id):
+        db.execute_query("DELETE FROM cart WHERE customer_id = %s", (customer_id,))
+
+    def begin_checkout(self, customer_id):
+        """Make sure the cart table holds the customer's cart (always true here)"""
+
+    def end_checkout(self, customer_id):
+        """Counterpart of begin_checkout (nothing to release here)"""
+
+    def discard(self, customer_id):
+        """Forget a cart whose rows the caller already deleted (nothing cached here)"""
+
+class WriteBehindCartStore:
+    """Carts held in process memory and flushed to the cart table in batches.
+
+    A customer's cart is loaded from the cart table on first access and then
+    served and modified in memory; changed carts are marked dirty and a daemon
+    thread rewrites them every flush_interval seconds (one DELETE plus one
+    multi-row INSERT per batch). cart_ids come from a database sequence block so
+    they are stable before the first flush and unique across processes.
+    begin_checkout() flushes one cart synchronously (checkout calls it before
+    reading the cart table) and keeps background flushes off that cart until
+    end_checkout(), so purchased lines cannot be written back after checkout
+    deletes them. Clean carts idle for idle_seconds are evicted. Database
+    reads and sequence blocks are fetched outside the store lock.
+
+    Carts live in one process, so this backend needs a single worker process (or
+    sticky sessions by customer); changes made within the last flush_interval
+    are lost if the process dies.
+    """
+
+    def __init__(self, flush_interval, idle_seconds, cart_id_block_size=100):
+        self.flush_interval = flush_interval
+        self.idle_seconds = idle_seconds
+        self.cart_ids = SequenceAllocator(
+            'cart_id', cart_id_block_size,
+            floor_query="SELECT COALESCE(MAX(cart_id), 0) + 1 FROM cart"
+        )
+        self._carts = {}  # customer_id -> {product_id: {'cart_id', 'quantity', 'added_at'}}
+        self._owners = {}  # cart_id -> (customer_id, product_id)
+        self._touched = {}  # customer_id -> monotonic time of last access
+        self._dirty = set()
+        self._checkouts = {}  # customer_id -> checkouts in progress
+        self._discards = 0  # bumped by discard() so a load racing with it is retried
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+
+    def lines(self, customer_id):
+        with self._cart(customer_id) as cart:
+            items = [dict(line, product_id=product_id) for product_id, line in cart.items()]
+        if not items:
+            return []
+
+        product_ids = [item['product_id'] for item in items]
+        products = db.execute_query(f"""
+        SELECT p.product_id, {CART_PRODUCT_COLUMNS}
+        FROM products p
+        LEFT JOIN categories cat ON p.category_id = cat.category_id
+        WHERE p.product_id IN ({', '.join(['%s'] * len(product_ids))}) AND p.is_active = TRUE
+        """, product_ids, fetch=True)
+        if products is None:
+            raise RuntimeError('Failed to load cart products')
+        products = {product['product_id']: product for product in products}
+
+        rows = []
+        for item in sorted(items, key=lambda item: item['added_at'], reverse=True):
+            product = products.get(item['product_id'])
+            if product:
+                rows.append({
+                    'cart_id': item['cart_id'],
+                    'customer_id': customer_id,
+                    'product_id': item['product_id'],
+                    'quantity': item['quantity'],
+                    'added_at': item['added_at'],
+                    **{key: value for key, value in product.items() if key != 'product_id'},
+                    'total_price': item['quantity'] * product['price']
+                })
+        return rows
+
+    def priced_lines(self, customer_id):
+        with self._cart(customer_id) as cart:
+            quantities = {product_id: line['quantity'] for product_id, line in cart.items()}
+        if not quantities:
+            return []
+
+        product_ids = list(quantities)
+        prices = db.execute_query(
+            f"SELECT product_id, price FROM products WHERE product_id IN ({', '.join(['%s'] * len(product_ids))}) AND is_active = TRUE",
+            product_ids, fetch=True
+        )
+        if prices is None:
+            raise RuntimeError('Failed to load cart products')
+        return [
+            {'product_id': row['product_id'], 'quantity': quantities[row['product_id']], 'price': row['price']}
+            for row in prices
+        ]
+
+    def line(self, cart_id):
+        with self._lock:
+            owner = self._owners.get(cart_id)
+        if owner is None:
+            # Line of a cart this process has not loaded yet
+            result = db.execute_query("SELECT customer_id FROM cart WHERE cart_id = %s", (cart_id,), fetch=True)
+            if not result:
+                return None
+            self._load(result[0]['customer_id'])
+            with self._lock:
+                owner = self._owners.get(cart_id)
+            if owner is None:
+                return None
+
+        customer_id, product_id = owner
+        with self._cart(customer_id) as cart:
+            line = cart.get(product_id)
+            if not line or line['cart_id'] != cart_id:
+                return None
+            return {'cart_id': cart_id, 'customer_id': customer_id, 'product_id': product_id, 'quantity': line['quantity']}
+
+    def add(self, customer_id, quantities):
+        # Stock is enforced by the holds the caller took, so every line is written
+        self._write_lines(customer_id, quantities, increment=True)
+        return sorted(quantities)
+
+    def set_quantity(self, customer_id, product_id, quantity):
+        self._write_lines(customer_id, {product_id: quantity}, increment=False)
+
+    def remove(self, cart_id):
+        line = self.line(cart_id)
+        if not line:
+            return False
+        with self._lock:
+            self._carts.get(line['customer_id'], {}).pop(line['product_id'], None)
+            self._owners.pop(cart_id, None)
+            self._dirty.add(line['customer_id'])
+        return True
+
+    def clear(self, customer_id):
+        # The flush deletes the customer's rows, so the old lines never need loading
+        self._ensure_flusher()
+        with self._lock:
+            for line in self._carts.get(customer_id, {}).values():
+                self._owners.pop(line['cart_id'], None)
+            self._carts[customer_id] = {}
+            self._touched[customer_id] = time.monotonic()
+            self._dirty.add(customer_id)
+
+    def begin_checkout(self, customer_id):
+        """Write the customer's cart to the cart table now and keep background flushes off it"""
+        with self._lock:
+            self._checkouts[customer_id] = self._checkouts.get(customer_id, 0) + 1
+        try:
+            # Also waits for a background flush that read the cart before it was marked
+            self.flush([customer_id], include_checkouts=True)
+        except Exception:
+            self.end_checkout(customer_id)
+            raise
+
+    def end_checkout(self, customer_id):
+        """Let background flushes write the cart again (call discard() first if it was bought)"""
+        with self._lock:
+            remaining = self._checkouts.pop(customer_id, 1) - 1
+            if remaining:
+                self._checkouts[customer_id] = remaining
+
+    def discard(self, customer_id):
+        """Forget a cart whose rows the caller already deleted (e.g. after checkout)"""
+        with self._lock:
+            for line in self._carts.pop(customer_id, {}).values():
+                self._owners.pop(line['cart_id'], None)
+            self._touched.pop(customer_id, None)
+            self._dirty.discard(customer_id)
+            self._discards += 1
+
+    def flush(self, customer_ids=None, include_checkouts=False):
+        """Rewrite dirty carts (all of them, or only customer_ids) in one transaction.
+
+        Carts with a checkout in progress are skipped unless include_checkouts.
+        """
+        with self._flush_lock:
+            with self._lock:
+                customers = self._dirty if customer_ids is None else self._dirty.intersection(customer_ids)
+                if not include_checkouts:
+                    customers = customers.difference(self._checkouts)
+                customers = sorted(customers)
+                if not customers:
+                    return 0
+                rows = [
+                    (line['cart_id'], customer_id, product_id, line['quantity'], line['added_at'])
+                    for customer_id in customers
+                    for product_id, line in self._carts.get(customer_id, {}).items()
+                ]
+                self._dirty.difference_update(customers)
+
+            connection = db.get_connection()
+            try:
+                if not connection:
+                    raise RuntimeError('Database connection failed')
+                cursor = connection.cursor(dictionary=True)
+                try:
+                    connection.start_transaction()
+                    cursor.execute(
+                        f"DELETE FROM cart WHERE customer_id IN ({', '.join(['%s'] * len(customers))})",
+                        customers
+                    )
+                    if rows:
+                        cursor.executemany("""
+                        INSERT INTO cart (cart_id, customer_id, product_id, quantity, added_at)
+                        VALUES (%s, %s, %s, %s, %s)
+                        """, rows)
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
+                    connection.close()
+            except Exception:
+                # Keep the carts dirty so the next flush retries them
+                with self._lock:
+                    self._dirty.update(customer for customer in customers if customer in self._carts)
+                raise
+            return len(customers)
+
+    def _write_lines(self, customer_id, quantities, increment):
+        """Set (or add to) the quantities of {product_id: quantity} lines"""
+        self._ensure_flusher()
+        new_ids = {}
+        while True:
+            with self._cart(customer_id) as cart:
+                missing = [product_id for product_id in quantities if product_id not in cart and product_id not in new_ids]
+                if not missing:
+                    for product_id, quantity in quantities.items():
+                        line = cart.get(product_id)
+                        if line is None:
+                            line = cart[product_id] = {'cart_id': new_ids[product_id], 'quantity': 0, 'added_at': datetime.now()}
+                            self._owners[line['cart_id']] = (customer_id, product_id)
+                        line['quantity'] = line['quantity'] + quantity if increment else quantity
+                    self._dirty.add(customer_id)
+                    return
+            # A new sequence block is a database round trip, so ids are taken
+            # outside the store lock; ids left unused are simply skipped
+            for product_id in missing:
+                new_ids[product_id] = self.cart_ids.next()
+
+    @contextmanager
+    def _cart(self, customer_id):
+        """Yield the customer's in-memory cart with the store lock held, loading it first if needed"""
+        while True:
+            self._load(customer_id)
+            with self._lock:
+                cart = self._carts.get(customer_id)
+                if cart is not None:
+                    self._touched[customer_id] = time.monotonic()
+                    yield cart
+                    return
+
+    def _load(self, customer_id):
+        """Read the customer's cart from the cart table unless it is already in memory"""
+        while True:
+            with self._lock:
+                if customer_id in self._carts:
+                    return
+                discards = self._discards
+
+            rows = db.execute_query(
+                "SELECT cart_id, product_id, quantity, added_at FROM cart WHERE customer_id = %s",
+                (customer_id,), fetch=True
+            )
+            if rows is None:
+                raise RuntimeError('Failed to load cart')
+
+            with self._lock:
+                if customer_id in self._carts:
+                    return
+                if discards != self._discards:
+                    # A checkout may have deleted the rows read above; read again
+                    continue
+                cart = {
+                    row['product_id']: {'cart_id': row['cart_id'], 'quantity': row['quantity'], 'added_at': row['added_at']}
+                    for row in rows
+                }
+                for product_id, line in cart.items():
+                    self._owners[line['cart_id']] = (customer_id, product_id)
+                self._carts[customer_id] = cart
+                self._touched[customer_id] = time.monotonic()
+                return
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [
+                customer_id for customer_id, touched in self._touched.items()
+                if touched < cutoff and customer_id not in self._dirty and customer_id not in self._checkouts
+            ]
+            for customer_id in idle:
+                self.discard(customer_id)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name='cart-flusher', daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                self._evict_idle()
+            except Exception:
+                logger.exception("Cart flush error")
+
+class CartSummaryCache:
+    """Per-customer cart totals kept up to date by the cart routes.
+
+    An entry holds each line's quantity and unit price plus the running item
+    count and Decimal subtotal. Mutations adjust it in place when the line's
+    price is already known and drop it otherwise (e.g. a product new to the
+    cart); the next read rebuilds it from one cart/products query. Entries are
+    dropped when a product in them changes (price, activation) and expire
+    after ttl seconds to pick up changes made by other worker processes.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}  # customer_id -> {'lines': {product_id: [quantity, price]}, 'subtotal', 'loaded_at'}
+        self._customers_by_product = {}  # product_id -> {customer_id}
+        self._lock = threading.Lock()
+
+    def get(self, customer_id):
+        """Return (item_count, subtotal) or None if not cached"""
+        with self._lock:
+            entry = self._entries.get(customer_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry['loaded_at'] >= self.ttl:
+                self._drop(customer_id)
+                return None
+            return len(entry['lines']), entry['subtotal']
+
+    def store(self, customer_id, lines):
+        """Cache totals for lines ([{product_id, quantity, price}]) and return (item_count, subtotal)"""
+        entry_lines = {line['product_id']: [line['quantity'], line['price']] for line in lines}
+        subtotal = sum((quantity * price for quantity, price in entry_lines.values()), Decimal('0.00'))
+        with self._lock:
+            self._drop(customer_id)
+            self._entries[customer_id] = {'lines': entry_lines, 'subtotal': subtotal, 'loaded_at': time.monotonic()}
+            for product_id in entry_lines:
+                self._customers_by_product.setdefault(product_id, set()).add(customer_id)
+        return len(entry_lines), subtotal
+
+    def set_quantity(self, customer_id, product_id, quantity):
+        """Record a line's new quantity (0 removes it)"""
+        with self._lock:
+            self._apply(customer_id, product_id, lambda current: quantity)
+
+    def add_quantity(self, customer_id, product_id, delta):
+        """Record quantity added to (or, if negative, taken from) a line"""
+        with self._lock:
+            self._apply(customer_id, product_id, lambda current: current + delta)
+
+    def _apply(self, customer_id, product_id, new_quantity):
+        entry = self._entries.get(customer_id)
+        if entry is None:
+            return
+        line = entry['lines'].get(product_id)
+        if line is None:
+            if new_quantity(0) > 0:
+                # Unit price unknown: rebuild on the next read
+                self._drop(customer_id)
+            return
+
+        quantity = new_quantity(line[0])
+        entry['subtotal'] += (quantity - line[0]) * line[1]
+        if quantity > 0:
+            line[0] = quantity
+        else:
+            del entry['lines'][product_id]
+            self._customers_by_product.get(product_id, set()).discard(customer_id)
+
+    def forget(self, customer_id):
+        with self._lock:
+            self._drop(customer_id)
+
+    def invalidate_product(self, product_id):
+        """Drop every cached summary that contains the product"""
+        with self._lock:
+            for customer_id in list(self._customers_by_product.pop(product_id, ())):
+                self._drop(customer_id)
+
+    def _drop(self, customer_id):
+        entry = self._entries.pop(customer_id, None)
+        if entry:
+            for product_id in entry['lines']:
+                customers = self._customers_by_product.get(product_id)
+                if customers is not None:
+                    customers.discard(customer_id)
+                    if not customers:
+                        del self._customers_by_product[product_id]
+
+def create_cart_store():
+    """Build the cart backend selected by CART_BACKEND (mysql or memory)"""
+    backend = os.getenv('CART_BACKEND', 'mysql').lower()
+    if backend == 'memory':
+        return WriteBehindCartStore(
+            flush_interval=float(os.getenv('CART_FLUSH_SECONDS', 2)),
+            idle_seconds=int(os.getenv('CART_IDLE_SECONDS', 1800))
+        )
+    if backend != 'mysql':
+        raise ValueError(f'Unknown CART_BACKEND: {backend}')
+    return MySQLCartStore()
+
+cart_store = create_cart_store()
+cart_summary_cache = CartSummaryCache(ttl=int(os.getenv('CART_SUMMARY_TTL_SECONDS', 30)))
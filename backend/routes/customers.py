@@ -78,22 +78,26 @@ def get_customer(customer_id):
     try:
         query = """
         SELECT 
-            customer_id,
-            first_name,
-            last_name,
-            email,
-            phone,
-            address,
-            city,
-            state,
-            zipcode,
-            date_of_birth,
-            gender,
-            total_spent,
-            loyalty_points,
-            registration_date
-        FROM customers 
-        WHERE customer_id = %s AND is_active = TRUE
+            c.customer_id,
+            c.first_name,
+            c.last_name,
+            c.email,
+            c.phone,
+            c.address,
+            c.city,
+            c.state,
+            c.zipcode,
+            c.date_of_birth,
+            c.gender,
+            c.total_spent,
+            c.loyalty_points,
+            c.registration_date,
+            COALESCE(cs.order_count, 0) as order_count,
+            COALESCE(cs.lifetime_value, 0) as lifetime_value,
+            cs.last_order_at
+        FROM customers c
+        LEFT JOIN customer_stats cs ON c.customer_id = cs.customer_id
+        WHERE c.customer_id = %s AND c.is_active = TRUE
         """
         
         result = db.execute_query(query, (customer_id,), fetch=True)
@@ -196,7 +200,7 @@ def get_all_customers():
         
         query = f"""
         SELECT 
-            customer_id,
+            customers.customer_id,
             CONCAT(first_name, ' ', last_name) as full_name,
             email,
             phone,
@@ -205,8 +209,11 @@ def get_all_customers():
             total_spent,
             loyalty_points,
             registration_date,
-            (SELECT COUNT(*) FROM orders WHERE customer_id = customers.customer_id) as order_count
+            COALESCE(cs.order_count, 0) as order_count,
+            COALESCE(cs.lifetime_value, 0) as lifetime_value,
+            cs.last_order_at
         FROM customers
+        LEFT JOIN customer_stats cs ON customers.customer_id = cs.customer_id
         WHERE {where_clause}
         ORDER BY registration_date DESC
         LIMIT %s OFFSET %s
@@ -1,18 +1,35 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response
 from db.db_config import DatabaseConfig
+from db.sequences import SequenceAllocator
+from log_config import get_logger
+from mysql.connector import Error
+from routes.products import product_analytics_snapshot, lock_products, write_stock_levels, insert_inventory_logs
 import json
 from datetime import datetime, timedelta
-import random
-import string
+from decimal import Decimal
+import csv
+import io
+import os
+import zlib
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
 
 orders_bp = Blueprint('orders', __name__)
 db = DatabaseConfig()
+logger = get_logger('orders')
+
+TAX_RATE = Decimal('0.08')  # 8% tax rate
+
+order_number_sequence = SequenceAllocator('order_number', int(os.getenv('ORDER_NUMBER_BLOCK_SIZE', 100)))
 
 def generate_order_number():
     """Generate unique order number"""
-    timestamp = datetime.now().strftime("%Y%m%d")
-    random_part = ''.join(random.choices(string.digits, k=4))
-    return f"ORD-{timestamp}-{random_part}"
+    return f"ORD-{datetime.now().strftime('%Y%m%d')}-{order_number_sequence.next():08d}"
 
 @orders_bp.route('/', methods=['GET'])
 def get_orders():
@@ -35,13 +52,17 @@ def get_orders():
             where_conditions.append("o.order_status = %s")
             params.append(status)
 
-        if start_date:
-            where_conditions.append("DATE(o.order_date) >= %s")
-            params.append(start_date)
+        # Half-open timestamp range so idx_order_date and the composite indexes apply
+        try:
+            if start_date:
+                where_conditions.append("o.order_date >= %s")
+                params.append(datetime.strptime(start_date, '%Y-%m-%d'))
 
-        if end_date:
-            where_conditions.append("DATE(o.order_date) <= %s")
-            params.append(end_date)
+            if end_date:
+                where_conditions.append("o.order_date < %s")
+                params.append(datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1))
+        except ValueError:
+            return jsonify({'error': 'start_date and end_date must be YYYY-MM-DD'}), 400
 
         where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
         offset = (page - 1) * limit
@@ -92,64 +113,86 @@ def get_orders():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def load_order_details(order_ids):
+    """Load orders with their items and banking transaction in one round trip.
+
+    Returns {order_id: {'order', 'items', 'banking_transaction'}} for the ids
+    that exist; used for a single order and for batches (admin list view).
+    """
+    if not order_ids:
+        return {}
+
+    order_ids = list(order_ids)
+    placeholders = ', '.join(['%s'] * len(order_ids))
+
+    order_query = f"""
+    SELECT 
+        o.*,
+        CONCAT(c.first_name, ' ', c.last_name) as customer_name,
+        c.email as customer_email,
+        c.phone as customer_phone,
+        s.store_name,
+        s.address as store_address,
+        CONCAT(e.first_name, ' ', e.last_name) as employee_name
+    FROM orders o
+    LEFT JOIN customers c ON o.customer_id = c.customer_id
+    LEFT JOIN stores s ON o.store_id = s.store_id
+    LEFT JOIN employees e ON o.employee_id = e.employee_id
+    WHERE o.order_id IN ({placeholders})
+    """
+
+    items_query = f"""
+    SELECT 
+        oi.*,
+        p.product_name,
+        p.brand,
+        p.model,
+        c.category_name
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.product_id
+    LEFT JOIN categories c ON p.category_id = c.category_id
+    WHERE oi.order_id IN ({placeholders})
+    ORDER BY oi.order_id, oi.item_id
+    """
+
+    banking_query = f"""
+    SELECT bt.*, ba.account_number, ba.account_type
+    FROM banking_transactions bt
+    JOIN banking_accounts ba ON bt.account_id = ba.account_id
+    WHERE bt.related_order_id IN ({placeholders})
+    ORDER BY bt.transaction_id
+    """
+
+    results = db.execute_multi_statement([
+        (order_query, order_ids),
+        (items_query, order_ids),
+        (banking_query, order_ids)
+    ])
+    if results is None:
+        raise RuntimeError('Failed to load order details')
+
+    orders, items, transactions = results
+    details = {
+        order['order_id']: {'order': order, 'items': [], 'banking_transaction': None}
+        for order in orders
+    }
+    for item in items:
+        details[item['order_id']]['items'].append(item)
+    for transaction in transactions:
+        detail = details.get(transaction['related_order_id'])
+        if detail and detail['banking_transaction'] is None:
+            detail['banking_transaction'] = transaction
+    return details
+
 @orders_bp.route('/<int:order_id>', methods=['GET'])
 def get_order(order_id):
     try:
-        # Get order details
-        order_query = """
-        SELECT 
-            o.*,
-            CONCAT(c.first_name, ' ', c.last_name) as customer_name,
-            c.email as customer_email,
-            c.phone as customer_phone,
-            s.store_name,
-            s.address as store_address,
-            CONCAT(e.first_name, ' ', e.last_name) as employee_name
-        FROM orders o
-        LEFT JOIN customers c ON o.customer_id = c.customer_id
-        LEFT JOIN stores s ON o.store_id = s.store_id
-        LEFT JOIN employees e ON o.employee_id = e.employee_id
-        WHERE o.order_id = %s
-        """
-        
-        order_result = db.execute_query(order_query, (order_id,), fetch=True)
+        details = load_order_details([order_id])
         
-        if not order_result:
+        if order_id not in details:
             return jsonify({'error': 'Order not found'}), 404
 
-        order = order_result[0]
-
-        # Get order items
-        items_query = """
-        SELECT 
-            oi.*,
-            p.product_name,
-            p.brand,
-            p.model,
-            c.category_name
-        FROM order_items oi
-        JOIN products p ON oi.product_id = p.product_id
-        LEFT JOIN categories c ON p.category_id = c.category_id
-        WHERE oi.order_id = %s
-        """
-        
-        items = db.execute_query(items_query, (order_id,), fetch=True)
-
-        # Get related banking transaction
-        banking_query = """
-        SELECT bt.*, ba.account_number, ba.account_type
-        FROM banking_transactions bt
-        JOIN banking_accounts ba ON bt.account_id = ba.account_id
-        WHERE bt.related_order_id = %s
-        """
-        
-        banking_transaction = db.execute_query(banking_query, (order_id,), fetch=True)
-
-        return jsonify({
-            'order': order,
-            'items': items or [],
-            'banking_transaction': banking_transaction[0] if banking_transaction else None
-        })
+        return jsonify(details[order_id])
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -168,128 +211,117 @@ def create_order():
         if not data['items']:
             return jsonify({'error': 'Order must contain at least one item'}), 400
 
-        # Calculate totals
-        subtotal = 0
-        order_items = []
-        
+        # Merge repeated lines so each product is locked and decremented once
+        quantities = {}
         for item in data['items']:
             if 'product_id' not in item or 'quantity' not in item:
                 return jsonify({'error': 'Each item must have product_id and quantity'}), 400
-            
-            # Get product details
-            product_query = "SELECT price, stock_quantity FROM products WHERE product_id = %s AND is_active = TRUE"
-            product_result = db.execute_query(product_query, (item['product_id'],), fetch=True)
-            
-            if not product_result:
-                return jsonify({'error': f'Product {item["product_id"]} not found'}), 404
-            
-            product = product_result[0]
-            
-            if product['stock_quantity'] < item['quantity']:
-                return jsonify({'error': f'Insufficient stock for product {item["product_id"]}'}), 400
-            
-            unit_price = product['price']
-            total_price = unit_price * item['quantity']
-            subtotal += total_price
-            
-            order_items.append({
-                'product_id': item['product_id'],
-                'quantity': item['quantity'],
-                'unit_price': unit_price,
-                'total_price': total_price
-            })
-
-        # Calculate taxes and total
-        tax_rate = 0.08  # 8% tax rate
-        tax_amount = subtotal * tax_rate
-        shipping_cost = data.get('shipping_cost', 0)
-        discount_amount = data.get('discount_amount', 0)
-        total_amount = subtotal + tax_amount + shipping_cost - discount_amount
-
-        # Generate order number
-        order_number = generate_order_number()
-
-        # Create order
-        order_query = """
-        INSERT INTO orders (
-            customer_id, store_id, employee_id, order_number, 
-            payment_method, subtotal, tax_amount, shipping_cost, 
-            discount_amount, total_amount, shipping_address, billing_address, notes
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        order_params = (
-            data['customer_id'],
-            data['store_id'],
-            data.get('employee_id'),
-            order_number,
-            data['payment_method'],
-            subtotal,
-            tax_amount,
-            shipping_cost,
-            discount_amount,
-            total_amount,
-            data.get('shipping_address'),
-            data.get('billing_address'),
-            data.get('notes')
-        )
+            try:
+                product_id = int(item['product_id'])
+                quantity = int(item['quantity'])
+            except (ValueError, TypeError):
+                return jsonify({'error': 'product_id and quantity must be integers'}), 400
+            if quantity <= 0:
+                return jsonify({'error': f'Quantity for product {product_id} must be greater than 0'}), 400
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        shipping_cost = Decimal(str(data.get('shipping_cost', 0)))
+        discount_amount = Decimal(str(data.get('discount_amount', 0)))
+        employee_id = data.get('employee_id')
 
-        # Execute order creation
         connection = db.get_connection()
         if not connection:
             return jsonify({'error': 'Database connection failed'}), 500
 
         try:
             cursor = connection.cursor(dictionary=True)
-            cursor.execute(order_query, order_params)
+            connection.start_transaction()
+
+            # Fetch and lock every product in the order with one statement
+            products = lock_products(cursor, quantities, active_only=True)
+
+            for product_id, quantity in quantities.items():
+                if product_id not in products:
+                    connection.rollback()
+                    return jsonify({'error': f'Product {product_id} not found'}), 404
+                # Units held by carts are not available to direct orders
+                if products[product_id]['stock_quantity'] - products[product_id]['reserved_quantity'] < quantity:
+                    connection.rollback()
+                    return jsonify({'error': f'Insufficient stock for product {product_id}'}), 400
+
+            # Calculate totals
+            subtotal = Decimal('0')
+            order_items = []
+            for product_id, quantity in quantities.items():
+                unit_price = products[product_id]['price']
+                total_price = unit_price * quantity
+                subtotal += total_price
+                order_items.append((product_id, quantity, unit_price, total_price))
+
+            tax_amount = (subtotal * TAX_RATE).quantize(Decimal('0.01'))
+            total_amount = subtotal + tax_amount + shipping_cost - discount_amount
+
+            # Generate order number
+            order_number = generate_order_number()
+
+            # Create order
+            order_query = """
+            INSERT INTO orders (
+                customer_id, store_id, employee_id, order_number, 
+                payment_method, subtotal, tax_amount, shipping_cost, 
+                discount_amount, total_amount, shipping_address, billing_address, notes
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            cursor.execute(order_query, (
+                data['customer_id'],
+                data['store_id'],
+                employee_id,
+                order_number,
+                data['payment_method'],
+                subtotal,
+                tax_amount,
+                shipping_cost,
+                discount_amount,
+                total_amount,
+                data.get('shipping_address'),
+                data.get('billing_address'),
+                data.get('notes')
+            ))
             order_id = cursor.lastrowid
 
-            # Insert order items and update stock
-            for item in order_items:
-                # Insert order item
-                item_query = """
-                INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price)
-                VALUES (%s, %s, %s, %s, %s)
-                """
-                cursor.execute(item_query, (
-                    order_id, item['product_id'], item['quantity'], 
-                    item['unit_price'], item['total_price']
-                ))
-
-                # Update product stock
-                stock_query = """
-                UPDATE products 
-                SET stock_quantity = stock_quantity - %s 
-                WHERE product_id = %s
-                """
-                cursor.execute(stock_query, (item['quantity'], item['product_id']))
-
-                # Log inventory change
-                log_query = """
-                INSERT INTO inventory_logs (
-                    product_id, transaction_type, quantity_change, 
-                    reason, reference_id, employee_id
-                ) VALUES (%s, 'OUT', %s, %s, %s, %s)
-                """
-                cursor.execute(log_query, (
-                    item['product_id'], -item['quantity'], 
-                    f'Sale - Order {order_number}', order_id, data.get('employee_id')
-                ))
+            # Multi-row insert of all order items
+            cursor.executemany("""
+            INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price)
+            VALUES (%s, %s, %s, %s, %s)
+            """, [(order_id,) + item for item in order_items])
 
-            connection.commit()
+            # One UPDATE ... CASE for stock, one multi-row insert for the inventory log
+            new_stock = {
+                product_id: products[product_id]['stock_quantity'] - quantity
+                for product_id, quantity in quantities.items()
+            }
+            write_stock_levels(cursor, new_stock)
+            insert_inventory_logs(cursor, [
+                (
+                    product_id, 'OUT', -quantity,
+                    products[product_id]['stock_quantity'], new_stock[product_id],
+                    f'Sale - Order {order_number}', order_id, employee_id
+                )
+                for product_id, quantity in quantities.items()
+            ])
 
             # Create banking transaction if payment method requires it
             if data['payment_method'] in ['BANK_ACCOUNT', 'CREDIT_CARD', 'DEBIT_CARD']:
                 # Get customer's primary account
-                account_query = """
+                cursor.execute("""
                 SELECT account_id, balance FROM banking_accounts 
                 WHERE customer_id = %s AND account_status = 'ACTIVE'
                 ORDER BY account_id LIMIT 1
-                """
-                account_result = db.execute_query(account_query, (data['customer_id'],), fetch=True)
+                FOR UPDATE
+                """, (data['customer_id'],))
+                account = cursor.fetchone()
                 
-                if account_result:
-                    account = account_result[0]
+                if account:
                     new_balance = account['balance'] - total_amount
                     
                     transaction_query = """
@@ -298,12 +330,13 @@ def create_order():
                         description, related_order_id
                     ) VALUES (%s, 'DEBIT', %s, %s, %s, %s)
                     """
-                    
-                    db.execute_query(transaction_query, (
+                    cursor.execute(transaction_query, (
                         account['account_id'], total_amount, new_balance,
                         f'Payment for Order {order_number}', order_id
                     ))
 
+            connection.commit()
+
             return jsonify({
                 'message': 'Order created successfully',
                 'order_id': order_id,
@@ -346,6 +379,7 @@ def update_order_status():
         if result == 0:
             return jsonify({'error': 'Order not found'}), 404
 
+        product_analytics_snapshot.invalidate()
         return jsonify({'message': 'Order status updated successfully'})
 
     except Exception as e:
@@ -355,48 +389,54 @@ def update_order_status():
 def get_order_analytics():
     try:
         days = int(request.args.get('days', 30))
-        print(f"Analytics request for {days} days")
         
+        # Trend, status and payment breakdowns read daily_order_rollup
+        # (about days x statuses x payment methods x stores x slots rows) instead of orders;
+        # a single slot row can be negative, so empty groups are dropped after summing
+
         # Daily sales trend
         sales_trend_query = """
         SELECT 
-            DATE(order_date) as order_date,
-            COUNT(*) as order_count,
+            rollup_date as order_date,
+            SUM(order_count) as order_count,
             SUM(total_amount) as revenue,
-            AVG(total_amount) as avg_order_value
-        FROM orders 
-        WHERE order_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+            SUM(total_amount) / SUM(order_count) as avg_order_value
+        FROM daily_order_rollup 
+        WHERE rollup_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
         AND order_status != 'CANCELLED'
-        GROUP BY DATE(order_date)
-        ORDER BY order_date DESC
+        GROUP BY rollup_date
+        HAVING SUM(order_count) > 0
+        ORDER BY rollup_date DESC
         """
 
         # Order status distribution
         status_query = """
         SELECT 
             order_status,
-            COUNT(*) as count,
+            SUM(order_count) as count,
             SUM(total_amount) as total_value
-        FROM orders 
-        WHERE order_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+        FROM daily_order_rollup 
+        WHERE rollup_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
         GROUP BY order_status
+        HAVING SUM(order_count) > 0
         """
 
         # Payment method analysis
         payment_query = """
         SELECT 
             payment_method,
-            COUNT(*) as order_count,
+            SUM(order_count) as order_count,
             SUM(total_amount) as revenue,
-            AVG(total_amount) as avg_amount
-        FROM orders 
-        WHERE order_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+            SUM(total_amount) / SUM(order_count) as avg_amount
+        FROM daily_order_rollup 
+        WHERE rollup_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
         AND order_status != 'CANCELLED'
         GROUP BY payment_method
+        HAVING SUM(order_count) > 0
         ORDER BY revenue DESC
         """
 
-        # Top customers by orders
+        # Top customers by orders (per-customer data is not part of the rollup key)
         customers_query = """
         SELECT 
             c.customer_id,
@@ -414,23 +454,212 @@ def get_order_analytics():
         LIMIT 10
         """
 
-        sales_trend = db.execute_query(sales_trend_query, (days,), fetch=True)
-        status_distribution = db.execute_query(status_query, (days,), fetch=True)
-        payment_methods = db.execute_query(payment_query, (days,), fetch=True)
-        top_customers = db.execute_query(customers_query, (days,), fetch=True)
+        results = db.execute_parallel({
+            'sales_trend': (sales_trend_query, (days,)),
+            'status_distribution': (status_query, (days,)),
+            'payment_methods': (payment_query, (days,)),
+            'top_customers': (customers_query, (days,))
+        })
+
+        return jsonify({name: rows or [] for name, rows in results.items()})
 
-        print(f"Sales trend results: {sales_trend}")
-        print(f"Status distribution results: {status_distribution}")
-        print(f"Payment methods results: {payment_methods}")
-        print(f"Top customers results: {top_customers}")
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify({
-            'sales_trend': sales_trend or [],
-            'status_distribution': status_distribution or [],
-            'payment_methods': payment_methods or [],
-            'top_customers': top_customers or []
-        })
+EXPORT_COLUMNS = [
+    'order_id', 'order_number', 'order_date', 'order_status', 'payment_method',
+    'payment_status', 'subtotal', 'tax_amount', 'shipping_cost', 'discount_amount',
+    'total_amount', 'customer_id', 'customer_name', 'customer_email', 'item_id',
+    'product_id', 'product_name', 'quantity', 'unit_price', 'item_total'
+]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows')
+}
+
+def export_arrow_schema():
+    money = pa.decimal128(12, 2)
+    return pa.schema([
+        ('order_id', pa.int64()), ('order_number', pa.string()), ('order_date', pa.timestamp('s')),
+        ('order_status', pa.string()), ('payment_method', pa.string()), ('payment_status', pa.string()),
+        ('subtotal', money), ('tax_amount', money), ('shipping_cost', money), ('discount_amount', money),
+        ('total_amount', money), ('customer_id', pa.int64()), ('customer_name', pa.string()),
+        ('customer_email', pa.string()), ('item_id', pa.int64()), ('product_id', pa.int64()),
+        ('product_name', pa.string()), ('quantity', pa.int64()), ('unit_price', money), ('item_total', money)
+    ])
+
+class ExportSink(io.RawIOBase):
+    """Write-only file object that lets a streaming response drain what was written"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_export_rows(query, params, batch_size=1000):
+    """Yield row batches from an unbuffered (server-side) cursor in constant memory"""
+    connection = db.get_connection()
+    if not connection:
+        raise RuntimeError('Database connection failed')
+
+    cursor = connection.cursor(buffered=False)
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        # An abandoned download leaves unread rows; closing the connection discards them
+        try:
+            cursor.close()
+        except Error:
+            pass
+        connection.close()
+
+def encode_export(batches, output_format):
+    """Turn row batches into CSV, Parquet or Arrow IPC byte chunks"""
+    if output_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for rows in batches:
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+        return
+
+    schema = export_arrow_schema()
+    sink = ExportSink()
+    if output_format == 'parquet':
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    for rows in batches:
+        columns = list(zip(*rows))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        ))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+@orders_bp.route('/export', methods=['GET'])
+def export_orders():
+    """Stream orders joined with their items and customers.
+
+    Rows come out in (order_id, item_id) order. To resume an interrupted
+    download, drop the rows of the last order_id received (it may be
+    incomplete) and request again with after_order_id set to the last order_id
+    that was received completely.
+    """
+    try:
+        output_format = request.args.get('format', 'csv')
+        if output_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'Invalid format. Must be one of: {list(EXPORT_FORMATS)}'}), 400
+        if output_format != 'csv' and pa is None:
+            return jsonify({'error': f'{output_format} export requires pyarrow to be installed'}), 400
+
+        compress = request.args.get('compress') == 'gzip'
+        if compress and output_format == 'parquet':
+            return jsonify({'error': 'Parquet output is already compressed'}), 400
+
+        where_conditions = ["o.order_id > %s"]
+        params = [int(request.args.get('after_order_id', 0))]
+
+        status = request.args.get('status')
+        if status:
+            where_conditions.append("o.order_status = %s")
+            params.append(status)
+
+        try:
+            if request.args.get('start_date'):
+                where_conditions.append("o.order_date >= %s")
+                params.append(datetime.strptime(request.args['start_date'], '%Y-%m-%d'))
+
+            if request.args.get('end_date'):
+                where_conditions.append("o.order_date < %s")
+                params.append(datetime.strptime(request.args['end_date'], '%Y-%m-%d') + timedelta(days=1))
+        except ValueError:
+            return jsonify({'error': 'start_date and end_date must be YYYY-MM-DD'}), 400
+
+        query = f"""
+        SELECT 
+            o.order_id,
+            o.order_number,
+            o.order_date,
+            o.order_status,
+            o.payment_method,
+            o.payment_status,
+            o.subtotal,
+            o.tax_amount,
+            o.shipping_cost,
+            o.discount_amount,
+            o.total_amount,
+            c.customer_id,
+            CONCAT(c.first_name, ' ', c.last_name) as customer_name,
+            c.email as customer_email,
+            oi.item_id,
+            oi.product_id,
+            p.product_name,
+            oi.quantity,
+            oi.unit_price,
+            oi.total_price as item_total
+        FROM orders o
+        LEFT JOIN customers c ON o.customer_id = c.customer_id
+        LEFT JOIN order_items oi ON o.order_id = oi.order_id
+        LEFT JOIN products p ON oi.product_id = p.product_id
+        WHERE {' AND '.join(where_conditions)}
+        ORDER BY o.order_id, oi.item_id
+        """
 
+        mimetype, extension = EXPORT_FORMATS[output_format]
+        chunks = encode_export(iter_export_rows(query, params), output_format)
+        filename = f"orders.{extension}"
+        if compress:
+            chunks = gzip_chunks(chunks)
+            mimetype = 'application/gzip'
+            filename += '.gz'
+
+        return Response(
+            chunks,
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+
+    except ValueError:
+        return jsonify({'error': 'after_order_id must be an integer'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -559,6 +788,14 @@ def get_admin_orders():
         total_result = db.execute_query(count_query, count_params, fetch=True)
         total = total_result[0]['total'] if total_result else 0
         
+        # ?include=details attaches items and banking transaction for the whole page at once
+        if orders and request.args.get('include') == 'details':
+            details = load_order_details([order['order_id'] for order in orders])
+            for order in orders:
+                detail = details.get(order['order_id'], {})
+                order['items'] = detail.get('items', [])
+                order['banking_transaction'] = detail.get('banking_transaction')
+        
         return jsonify({
             'orders': orders or [],
             'pagination': {
@@ -570,7 +807,7 @@ def get_admin_orders():
         })
         
     except Exception as e:
-        print(f"Admin orders error: {e}")
+        logger.exception("Admin orders error")
         return jsonify({'error': str(e)}), 500
 
 @orders_bp.route('/admin/<int:order_id>/status', methods=['PUT'])
@@ -598,6 +835,7 @@ def admin_update_order_status(order_id):
         result = db.execute_query(query, (new_status, order_id))
         
         if result:
+            product_analytics_snapshot.invalidate()
             return jsonify({
                 'message': 'Order status updated successfully',
                 'order_id': order_id,
@@ -607,48 +845,179 @@ def admin_update_order_status(order_id):
             return jsonify({'error': 'Failed to update order status'}), 500
             
     except Exception as e:
-        print(f"Update order status error: {e}")
+        logger.exception("Update order status error for order %s", order_id)
+        return jsonify({'error': str(e)}), 500
+
+# Allowed order status transitions for bulk updates
+STATUS_TRANSITIONS = {
+    'PENDING': {'PROCESSING', 'CANCELLED'},
+    'PROCESSING': {'SHIPPED', 'CANCELLED'},
+    'SHIPPED': {'DELIVERED', 'RETURNED'},
+    'DELIVERED': {'RETURNED'},
+    'CANCELLED': set(),
+    'RETURNED': set()
+}
+
+def apply_status_chunk(updates):
+    """Apply {order_id: new_status} in one transaction and return per-order outcomes.
+
+    The per-row update_customer_total_spent trigger is deferred for this
+    connection and replaced by one grouped UPDATE customers ... JOIN over the
+    orders that became DELIVERED.
+    """
+    order_ids = sorted(updates)
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    outcomes = {}
+
+    connection = db.get_connection()
+    if not connection:
+        raise RuntimeError('Database connection failed')
+
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SET @defer_customer_totals = 1")
+        connection.start_transaction()
+
+        cursor.execute(f"""
+        SELECT order_id, order_status
+        FROM orders
+        WHERE order_id IN ({placeholders})
+        ORDER BY order_id
+        FOR UPDATE
+        """, order_ids)
+        current = {row['order_id']: row['order_status'] for row in cursor.fetchall()}
+
+        changes = {}
+        for order_id in order_ids:
+            new_status = updates[order_id]
+            if order_id not in current:
+                outcomes[order_id] = {'status': 'not_found'}
+            elif current[order_id] == new_status:
+                outcomes[order_id] = {'status': 'unchanged', 'order_status': new_status}
+            elif new_status not in STATUS_TRANSITIONS[current[order_id]]:
+                outcomes[order_id] = {
+                    'status': 'invalid_transition',
+                    'error': f'Cannot move order from {current[order_id]} to {new_status}'
+                }
+            else:
+                changes[order_id] = new_status
+                outcomes[order_id] = {'status': 'updated', 'previous_status': current[order_id], 'order_status': new_status}
+
+        if changes:
+            changed_ids = sorted(changes)
+            case_params = []
+            for order_id in changed_ids:
+                case_params.extend([order_id, changes[order_id]])
+
+            cursor.execute(f"""
+            UPDATE orders
+            SET order_status = CASE order_id {' '.join(['WHEN %s THEN %s'] * len(changed_ids))} END,
+                updated_at = NOW()
+            WHERE order_id IN ({', '.join(['%s'] * len(changed_ids))})
+            """, case_params + changed_ids)
+
+            delivered_ids = [order_id for order_id in changed_ids if changes[order_id] == 'DELIVERED']
+            if delivered_ids:
+                cursor.execute(f"""
+                UPDATE customers c
+                JOIN (
+                    SELECT 
+                        customer_id,
+                        SUM(total_amount) as spent,
+                        SUM(FLOOR(total_amount / 10)) as points
+                    FROM orders
+                    WHERE order_id IN ({', '.join(['%s'] * len(delivered_ids))})
+                    GROUP BY customer_id
+                ) d ON c.customer_id = d.customer_id
+                SET c.total_spent = c.total_spent + d.spent,
+                    c.loyalty_points = c.loyalty_points + d.points
+                """, delivered_ids)
+
+        connection.commit()
+        return outcomes
+
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        try:
+            cursor.execute("SET @defer_customer_totals = NULL")
+        finally:
+            cursor.close()
+            connection.close()
+
+@orders_bp.route('/admin/status/bulk', methods=['PUT'])
+def admin_bulk_update_order_status():
+    """Move many orders to a new status (e.g. warehouse scans) in chunked transactions"""
+    try:
+        data = request.get_json() or {}
+        
+        # Either {"updates": [{"order_id", "status"}, ...]} or {"order_ids": [...], "status": ...}
+        if 'updates' in data:
+            items = data['updates']
+        elif 'order_ids' in data and 'status' in data:
+            items = [{'order_id': order_id, 'status': data['status']} for order_id in data['order_ids']]
+        else:
+            return jsonify({'error': 'updates, or order_ids and status, are required'}), 400
+        
+        if not items:
+            return jsonify({'error': 'No orders to update'}), 400
+        if len(items) > 5000:
+            return jsonify({'error': 'At most 5000 orders per request'}), 400
+        
+        updates = {}
+        for index, item in enumerate(items):
+            try:
+                order_id = int(item['order_id'])
+            except (KeyError, ValueError, TypeError):
+                return jsonify({'error': f'Update {index} must have an integer order_id'}), 400
+            if item.get('status') not in STATUS_TRANSITIONS:
+                return jsonify({'error': f'Invalid status for order {order_id}. Must be one of: {list(STATUS_TRANSITIONS)}'}), 400
+            updates[order_id] = item['status']
+        
+        chunk_size = min(max(int(request.args.get('chunk_size', 500)), 1), 1000)
+        order_ids = sorted(updates)
+        
+        outcomes = {}
+        for start in range(0, len(order_ids), chunk_size):
+            chunk = {order_id: updates[order_id] for order_id in order_ids[start:start + chunk_size]}
+            try:
+                outcomes.update(apply_status_chunk(chunk))
+            except Exception as e:
+                logger.exception("Bulk order status chunk error")
+                for order_id in chunk:
+                    outcomes[order_id] = {'status': 'error', 'error': str(e)}
+        
+        summary = {}
+        for outcome in outcomes.values():
+            summary[outcome['status']] = summary.get(outcome['status'], 0) + 1
+        
+        if summary.get('updated'):
+            product_analytics_snapshot.invalidate()
+        
+        return jsonify({
+            'message': 'Bulk status update completed',
+            'summary': summary,
+            'orders': [{'order_id': order_id, **outcomes[order_id]} for order_id in order_ids]
+        }), 200
+        
+    except Exception as e:
+        logger.exception("Bulk update order status error")
         return jsonify({'error': str(e)}), 500
 
 @orders_bp.route('/admin/<int:order_id>', methods=['GET'])
 def admin_get_order_details(order_id):
     """Get detailed order information for admin"""
     try:
-        # Get order details
-        order_query = """
-        SELECT 
-            o.*,
-            c.name as customer_name,
-            c.email as customer_email,
-            c.phone as customer_phone
-        FROM orders o
-        JOIN customers c ON o.customer_id = c.customer_id
-        WHERE o.order_id = %s
-        """
-        
-        order = db.execute_query(order_query, (order_id,), fetch=True)
-        if not order:
+        details = load_order_details([order_id])
+        if order_id not in details:
             return jsonify({'error': 'Order not found'}), 404
             
-        # Get order items
-        items_query = """
-        SELECT 
-            oi.*,
-            p.product_name,
-            p.brand,
-            p.model
-        FROM order_items oi
-        JOIN products p ON oi.product_id = p.product_id
-        WHERE oi.order_id = %s
-        """
-        
-        items = db.execute_query(items_query, (order_id,), fetch=True)
-        
         return jsonify({
-            'order': order[0],
-            'items': items or []
+            'order': details[order_id]['order'],
+            'items': details[order_id]['items']
         })
         
     except Exception as e:
-        print(f"Get order details error: {e}")
+        logger.exception("Get order details error for order %s", order_id)
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
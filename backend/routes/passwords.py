@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import bcrypt
+import os
+import threading
+import time
+
+class PasswordQueueFull(Exception):
+    """Raised when too many password hashes are already queued or running"""
+
+class PasswordHasher:
+    """bcrypt hashing and verification on a small dedicated thread pool.
+
+    bcrypt releases the GIL while it works, so a few pool threads bound how
+    much CPU a login burst takes while the other request threads keep serving
+    the rest of the API. The caller still waits for its result, so this only
+    helps with threaded workers (gunicorn gthread, as entrypoint.sh runs it);
+    a sync worker is busy for the whole login either way.
+    At most max_pending operations may be queued or running; beyond that
+    callers get PasswordQueueFull immediately instead of waiting in line.
+    rounds is the bcrypt cost for new hashes; needs_rehash() reports hashes
+    made with a different cost so they can be upgraded on the next login.
+    """
+
+    def __init__(self, rounds, workers, max_pending, timeout):
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def hash(self, password):
+        """Hash a password with the configured cost"""
+        return self._run(
+            lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+        )
+
+    def check(self, password, hashed):
+        """Check password against hash"""
+        return self._run(lambda: bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8')))
+
+    def needs_rehash(self, hashed):
+        """True if the hash was made with a different cost than the configured one"""
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def _run(self, work):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordQueueFull('Too many password operations in progress')
+        try:
+            future = self._executor.submit(work)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordQueueFull('Password operation timed out')
+
+class LoginThrottle:
+    """Token buckets limiting login attempts per key (e.g. account, client IP).
+
+    Each key gets capacity tokens refilled at refill_per_minute; an attempt
+    takes one token from every key it names and is refused if any bucket is
+    empty. Buckets are per process, so with several workers the effective
+    limit is the per-worker limit times the worker count.
+    """
+
+    def __init__(self, limits, max_keys=100000):
+        self.limits = limits  # kind -> (capacity, refill_per_minute)
+        self.max_keys = max_keys
+        self._buckets = {}  # (kind, value) -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def allow(self, **keys):
+        """Take a token for each kind=value given; returns (allowed, retry_after_seconds)"""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+
+            buckets = []
+            retry_after = 0
+            for kind, value in keys.items():
+                if value is None or kind not in self.limits:
+                    continue
+                capacity, refill_per_minute = self.limits[kind]
+                bucket = self._buckets.setdefault((kind, value), [capacity, now])
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_per_minute / 60)
+                bucket[1] = now
+                if bucket[0] < 1:
+                    retry_after = max(retry_after, (1 - bucket[0]) * 60 / refill_per_minute)
+                buckets.append(bucket)
+
+            if retry_after:
+                return False, int(retry_after) + 1
+            for bucket in buckets:
+                bucket[0] -= 1
+            return True, 0
+
+    def _prune(self, now):
+        # Drop buckets that have refilled completely: they behave like new ones
+        for key, (tokens, updated_at) in list(self._buckets.items()):
+            capacity, refill_per_minute = self.limits[key[0]]
+            if tokens + (now - updated_at) * refill_per_minute / 60 >= capacity:
+                del self._buckets[key]
+
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv('BCRYPT_ROUNDS', 12)),
+    workers=int(os.getenv('PASSWORD_HASH_WORKERS', 2)),
+    max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', 8)),
+    timeout=float(os.getenv('PASSWORD_HASH_TIMEOUT_SECONDS', 10))
+)
+
+login_throttle = LoginThrottle({
+    'account': (int(os.getenv('LOGIN_ACCOUNT_BURST', 5)), float(os.getenv('LOGIN_ACCOUNT_PER_MINUTE', 5))),
+    'ip': (int(os.getenv('LOGIN_IP_BURST', 20)), float(os.getenv('LOGIN_IP_PER_MINUTE', 30)))
+})
@@ -0,0 +1,127 @@
+from db.db_config import DatabaseConfig
+from log_config import get_logger
+from datetime import datetime
+import os
+import threading
+import time
+
+db = DatabaseConfig()
+logger = get_logger('principals')
+
+# Source table and key column for each user type
+USER_TABLES = {
+    'admin': ('admin_users', 'admin_id'),
+    'employee': ('employees', 'employee_id'),
+    'customer': ('customers', 'customer_id')
+}
+
+# principals is the login directory. Every code path that creates a login user
+# must insert its principals row in the same transaction (register_user does);
+# users added straight to admin_users, employees or customers cannot log in
+# until sync_principals.py has copied them over. Until the table exists and
+# holds at least one row (a database that predates it), logins read the user
+# tables instead.
+_principals_ready = False
+
+def principals_ready():
+    """True once principals exists and has been populated"""
+    global _principals_ready
+    if not _principals_ready:
+        result = db.execute_query("SELECT EXISTS(SELECT 1 FROM principals) as populated", fetch=True)
+        _principals_ready = bool(result and result[0]['populated'])
+    return _principals_ready
+
+def find_principal(email, user_type):
+    """Look up login credentials for an active user with one indexed read"""
+    if not principals_ready():
+        return _find_in_user_table(email, user_type)
+    result = db.execute_query("""
+    SELECT user_type, user_id, email, password_hash, role, first_name, last_name
+    FROM principals
+    WHERE email = %s AND user_type = %s AND is_active = TRUE
+    """, (email, user_type), fetch=True)
+    return result[0] if result else None
+
+def _find_in_user_table(email, user_type):
+    table, key_column = USER_TABLES[user_type]
+    result = db.execute_query(f"""
+    SELECT %s as user_type, {key_column} as user_id, email, password_hash,
+           COALESCE(role, %s) as role, first_name, last_name
+    FROM {table}
+    WHERE email = %s AND is_active = TRUE
+    """, (user_type, user_type, email), fetch=True)
+    return result[0] if result else None
+
+def update_principal_hash(user_type, user_id, password_hash):
+    """Store a new password hash for a principal (principals owns hashes after backfill)"""
+    if not principals_ready():
+        table, key_column = USER_TABLES[user_type]
+        db.execute_query(f"UPDATE {table} SET password_hash = %s WHERE {key_column} = %s", (password_hash, user_id))
+        return
+    db.execute_query(
+        "UPDATE principals SET password_hash = %s WHERE user_type = %s AND user_id = %s",
+        (password_hash, user_type, user_id)
+    )
+
+class LastLoginRecorder:
+    """Deferred last_login updates, written in batches by a background thread.
+
+    record() only stores the login time in memory; every flush_interval seconds
+    the pending times are written with one UPDATE ... CASE per user table.
+    Times recorded within the last interval are lost if the process dies.
+    """
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._pending = {}  # (user_type, user_id) -> login time
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def record(self, user_type, user_id):
+        self._ensure_flusher()
+        with self._lock:
+            self._pending[(user_type, user_id)] = datetime.now()
+
+    def flush(self):
+        """Write all pending login times"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for user_type, (table, key_column) in USER_TABLES.items():
+            logins = {user_id: logged_in for (kind, user_id), logged_in in pending.items() if kind == user_type}
+            if not logins:
+                continue
+
+            user_ids = sorted(logins)
+            case_params = []
+            for user_id in user_ids:
+                case_params.extend([user_id, logins[user_id]])
+            result = db.execute_query(f"""
+            UPDATE {table}
+            SET last_login = CASE {key_column} {' '.join(['WHEN %s THEN %s'] * len(user_ids))} END
+            WHERE {key_column} IN ({', '.join(['%s'] * len(user_ids))})
+            """, case_params + user_ids)
+
+            if result is None:
+                logger.warning("Failed to write %s last_login for %s users, will retry", user_type, len(user_ids))
+                with self._lock:
+                    for user_id in user_ids:
+                        self._pending.setdefault((user_type, user_id), logins[user_id])
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name='last-login-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Last login flush error")
+
+last_login_recorder = LastLoginRecorder(flush_interval=float(os.getenv('LAST_LOGIN_FLUSH_SECONDS', 10)))
@@ -1,9 +1,70 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from db.db_config import DatabaseConfig
+from routes.cart_store import cart_summary_cache
+from log_config import get_logger, capped
+from mysql.connector import Error
+from datetime import datetime, timezone
+import csv
+import hashlib
 import json
+import os
+import threading
+import time
 
 products_bp = Blueprint('products', __name__)
 db = DatabaseConfig()
+logger = get_logger('products')
+
+# Last serialized body per catalog endpoint, keyed by endpoint -> (etag, body)
+_catalog_memo = {}
+_catalog_memo_lock = threading.Lock()
+
+def catalog_version(tables):
+    """Build a version token for the given tables from row counts and MAX(updated_at)"""
+    query = " UNION ALL ".join(
+        f"SELECT '{table}' as table_name, COUNT(*) as row_count, MAX(updated_at) as last_modified FROM {table}"
+        for table in tables
+    )
+    rows = db.execute_query(query, fetch=True)
+    if not rows:
+        return None, None
+
+    token = ";".join(f"{row['table_name']}:{row['row_count']}:{row['last_modified']}" for row in rows)
+    etag = hashlib.sha1(token.encode('utf-8')).hexdigest()
+
+    timestamps = [row['last_modified'] for row in rows if row['last_modified']]
+    last_modified = max(timestamps).replace(microsecond=0, tzinfo=timezone.utc) if timestamps else None
+    return etag, last_modified
+
+def conditional_catalog_response(key, tables, build_payload):
+    """Serve a catalog payload with ETag/Last-Modified, answering 304 without running the aggregate"""
+    etag, last_modified = catalog_version(tables)
+    if etag is None:
+        return jsonify(build_payload())
+
+    not_modified = request.if_none_match.contains(etag)
+    if not request.if_none_match and last_modified and request.if_modified_since:
+        not_modified = request.if_modified_since >= last_modified
+
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        with _catalog_memo_lock:
+            memo = _catalog_memo.get(key)
+
+        if memo and memo[0] == etag:
+            body = memo[1]
+        else:
+            body = jsonify(build_payload()).get_data()
+            with _catalog_memo_lock:
+                _catalog_memo[key] = (etag, body)
+
+        response = current_app.response_class(body, mimetype='application/json')
+
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
 
 @products_bp.route('/', methods=['GET'])
 def get_products():
@@ -108,33 +169,54 @@ def get_products():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+PRODUCT_DETAIL_INCLUDES = ('reviews', 'rating_histogram', 'also_bought')
+MAX_REVIEW_LIMIT = 100
+INVENTORY_TRANSACTION_TYPES = ('IN', 'OUT', 'ADJUSTMENT', 'RETURN')
+
 @products_bp.route('/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     try:
-        query = """
+        include = request.args.get('include', 'reviews')
+        includes = {part.strip() for part in include.split(',') if part.strip()}
+        invalid = includes - set(PRODUCT_DETAIL_INCLUDES)
+        if invalid:
+            return jsonify({'error': f'Invalid include: {", ".join(sorted(invalid))}. Must be one of: {list(PRODUCT_DETAIL_INCLUDES)}'}), 400
+
+        try:
+            review_page = int(request.args.get('review_page', 1))
+            review_limit = int(request.args.get('review_limit', 10))
+        except ValueError:
+            return jsonify({'error': 'review_page and review_limit must be integers'}), 400
+        if review_page < 1 or review_limit < 1:
+            return jsonify({'error': 'review_page and review_limit must be at least 1'}), 400
+        review_limit = min(review_limit, MAX_REVIEW_LIMIT)
+        review_offset = (review_page - 1) * review_limit
+
+        product_query = """
         SELECT 
             p.*,
             c.category_name,
             s.company_name as supplier_name,
-            s.contact_person as supplier_contact,
-            COALESCE(AVG(pr.rating), 0) as avg_rating,
-            COUNT(DISTINCT pr.review_id) as review_count
+            s.contact_person as supplier_contact
         FROM products p
         LEFT JOIN categories c ON p.category_id = c.category_id
         LEFT JOIN suppliers s ON p.supplier_id = s.supplier_id
-        LEFT JOIN product_reviews pr ON p.product_id = pr.product_id
         WHERE p.product_id = %s AND p.is_active = TRUE
-        GROUP BY p.product_id
         """
-        
-        result = db.execute_query(query, (product_id,), fetch=True)
-        
-        if not result:
-            return jsonify({'error': 'Product not found'}), 404
 
-        product = result[0]
+        rating_query = """
+        SELECT 
+            COALESCE(AVG(rating), 0) as avg_rating,
+            COUNT(*) as review_count,
+            COALESCE(SUM(rating = 1), 0) as rating_1,
+            COALESCE(SUM(rating = 2), 0) as rating_2,
+            COALESCE(SUM(rating = 3), 0) as rating_3,
+            COALESCE(SUM(rating = 4), 0) as rating_4,
+            COALESCE(SUM(rating = 5), 0) as rating_5
+        FROM product_reviews
+        WHERE product_id = %s
+        """
 
-        # Get reviews
         reviews_query = """
         SELECT 
             pr.*,
@@ -143,15 +225,61 @@ def get_product(product_id):
         JOIN customers c ON pr.customer_id = c.customer_id
         WHERE pr.product_id = %s
         ORDER BY pr.created_at DESC
-        LIMIT 10
+        LIMIT %s OFFSET %s
         """
-        
-        reviews = db.execute_query(reviews_query, (product_id,), fetch=True)
 
-        return jsonify({
-            'product': product,
-            'reviews': reviews or []
-        })
+        also_bought_query = """
+        SELECT 
+            p.product_id,
+            p.product_name,
+            p.brand,
+            p.price,
+            COUNT(DISTINCT oi2.order_id) as times_bought_together
+        FROM order_items oi1
+        JOIN order_items oi2 ON oi1.order_id = oi2.order_id AND oi2.product_id != oi1.product_id
+        JOIN products p ON oi2.product_id = p.product_id AND p.is_active = TRUE
+        WHERE oi1.product_id = %s
+        GROUP BY p.product_id
+        ORDER BY times_bought_together DESC
+        LIMIT 6
+        """
+
+        # Product, rating summary and the selected sections in one round trip
+        statements = [(product_query, (product_id,)), (rating_query, (product_id,))]
+        if 'reviews' in includes:
+            statements.append((reviews_query, (product_id, review_limit, review_offset)))
+        if 'also_bought' in includes:
+            statements.append((also_bought_query, (product_id,)))
+
+        results = db.execute_multi_statement(statements)
+        if results is None:
+            return jsonify({'error': 'Failed to load product'}), 500
+
+        product_result, rating_result = results[0], results[1]
+        if not product_result:
+            return jsonify({'error': 'Product not found'}), 404
+
+        product = product_result[0]
+        rating = rating_result[0]
+        product['avg_rating'] = rating['avg_rating']
+        product['review_count'] = rating['review_count']
+
+        response = {'product': product}
+        section_results = iter(results[2:])
+        if 'reviews' in includes:
+            response['reviews'] = next(section_results) or []
+            response['review_pagination'] = {
+                'page': review_page,
+                'limit': review_limit,
+                'total': rating['review_count'],
+                'pages': (rating['review_count'] + review_limit - 1) // review_limit
+            }
+        if 'rating_histogram' in includes:
+            response['rating_histogram'] = {str(stars): int(rating[f'rating_{stars}']) for stars in range(1, 6)}
+        if 'also_bought' in includes:
+            response['also_bought'] = next(section_results) or []
+
+        return jsonify(response)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -172,8 +300,10 @@ def get_categories():
         ORDER BY c.category_name
         """
         
-        categories = db.execute_query(query, fetch=True)
-        return jsonify({'categories': categories})
+        return conditional_catalog_response(
+            'categories', ('categories', 'products'),
+            lambda: {'categories': db.execute_query(query, fetch=True)}
+        )
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -194,8 +324,10 @@ def get_brands():
         ORDER BY p.brand
         """
         
-        brands = db.execute_query(query, fetch=True)
-        return jsonify({'brands': brands})
+        return conditional_catalog_response(
+            'brands', ('products',),
+            lambda: {'brands': db.execute_query(query, fetch=True)}
+        )
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -222,8 +354,10 @@ def get_featured_products():
         LIMIT 12
         """
         
-        products = db.execute_query(query, fetch=True)
-        return jsonify({'featured_products': products})
+        return conditional_catalog_response(
+            'featured', ('products', 'categories', 'product_reviews'),
+            lambda: {'featured_products': db.execute_query(query, fetch=True)}
+        )
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -283,69 +417,157 @@ def get_low_stock_products():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def compute_product_analytics():
+    """Run the product analytics aggregations and return the response payload"""
+    # Get top selling products
+    top_selling_query = """
+    SELECT 
+        p.product_id,
+        p.product_name,
+        p.brand,
+        SUM(oi.quantity) as total_sold,
+        SUM(oi.total_price) as revenue
+    FROM products p
+    JOIN order_items oi ON p.product_id = oi.product_id
+    JOIN orders o ON oi.order_id = o.order_id
+    WHERE o.order_status IN ('PROCESSING', 'DELIVERED') AND o.order_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+    GROUP BY p.product_id
+    ORDER BY total_sold DESC
+    LIMIT 10
+    """
+
+    # Get category performance
+    category_performance_query = """
+    SELECT 
+        c.category_name,
+        COUNT(DISTINCT p.product_id) as product_count,
+        SUM(oi.quantity) as total_sold,
+        SUM(oi.total_price) as revenue,
+        AVG(p.price) as avg_price
+    FROM categories c
+    JOIN products p ON c.category_id = p.category_id
+    LEFT JOIN order_items oi ON p.product_id = oi.product_id
+    LEFT JOIN orders o ON oi.order_id = o.order_id AND o.order_status IN ('PROCESSING', 'DELIVERED')
+    WHERE p.is_active = TRUE
+    GROUP BY c.category_id, c.category_name
+    ORDER BY revenue DESC
+    """
+
+    # Get inventory status
+    inventory_query = """
+    SELECT 
+        COUNT(*) as total_products,
+        SUM(CASE WHEN stock_quantity <= min_stock_level THEN 1 ELSE 0 END) as low_stock_count,
+        SUM(CASE WHEN stock_quantity = 0 THEN 1 ELSE 0 END) as out_of_stock_count,
+        AVG(stock_quantity) as avg_stock_level,
+        SUM(stock_quantity * cost_price) as total_inventory_value
+    FROM products 
+    WHERE is_active = TRUE
+    """
+
+    results = db.execute_parallel({
+        'top_selling': (top_selling_query, None),
+        'category_performance': (category_performance_query, None),
+        'inventory_stats': (inventory_query, None)
+    })
+    top_selling = results['top_selling']
+    category_performance = results['category_performance']
+    inventory_stats = results['inventory_stats']
+
+    if top_selling is None or category_performance is None or inventory_stats is None:
+        raise RuntimeError('Failed to compute product analytics')
+
+    return {
+        'top_selling_products': top_selling,
+        'category_performance': category_performance,
+        'inventory_statistics': inventory_stats[0] if inventory_stats else {}
+    }
+
+class AnalyticsSnapshot:
+    """Periodically materialized analytics payload served from memory.
+
+    The first request computes the snapshot synchronously; after that a daemon
+    thread recomputes it every refresh_seconds, and invalidate() (called on
+    order status changes) schedules an early background refresh. Refreshes are
+    at least min_refresh_seconds apart, so a steady stream of invalidations is
+    coalesced instead of recomputing back to back. Readers always get the last
+    complete snapshot, so latency does not depend on the queries.
+    """
+
+    def __init__(self, compute, refresh_seconds, min_refresh_seconds):
+        self.compute = compute
+        self.refresh_seconds = refresh_seconds
+        self.min_refresh_seconds = min_refresh_seconds
+        self._data = None
+        self._generated_at = None
+        self._refreshed_at = None  # monotonic time of the last refresh
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._scheduler = None
+
+    def get(self):
+        """Return (payload, generated_at), computing the first snapshot if needed"""
+        self._ensure_scheduler()
+        if self._data is None:
+            self.refresh()
+        with self._lock:
+            return self._data, self._generated_at
+
+    def refresh(self):
+        """Recompute the snapshot; concurrent callers wait for the running refresh"""
+        with self._refresh_lock:
+            data = self.compute()
+            with self._lock:
+                self._data = data
+                self._generated_at = datetime.now()
+                self._refreshed_at = time.monotonic()
+
+    def invalidate(self):
+        """Ask the scheduler thread to refresh now instead of at the next interval"""
+        self._wakeup.set()
+
+    def _ensure_scheduler(self):
+        if self._scheduler is not None:
+            return
+        with self._lock:
+            if self._scheduler is None:
+                self._scheduler = threading.Thread(target=self._run, name='analytics-snapshot', daemon=True)
+                self._scheduler.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.refresh_seconds)
+            if self._refreshed_at is not None:
+                # Invalidations during the wait below fold into this refresh
+                remaining = self.min_refresh_seconds - (time.monotonic() - self._refreshed_at)
+                if remaining > 0:
+                    time.sleep(remaining)
+            self._wakeup.clear()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Analytics snapshot refresh error")
+
+product_analytics_snapshot = AnalyticsSnapshot(
+    compute_product_analytics,
+    int(os.getenv('PRODUCT_ANALYTICS_REFRESH_SECONDS', 300)),
+    int(os.getenv('PRODUCT_ANALYTICS_MIN_REFRESH_SECONDS', 30))
+)
+
 @products_bp.route('/analytics', methods=['GET'])
 def get_product_analytics():
     try:
-        print("Product analytics request received")
-        
-        # Get top selling products
-        top_selling_query = """
-        SELECT 
-            p.product_id,
-            p.product_name,
-            p.brand,
-            SUM(oi.quantity) as total_sold,
-            SUM(oi.total_price) as revenue
-        FROM products p
-        JOIN order_items oi ON p.product_id = oi.product_id
-        JOIN orders o ON oi.order_id = o.order_id
-        WHERE o.order_status IN ('PROCESSING', 'DELIVERED') AND o.order_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-        GROUP BY p.product_id
-        ORDER BY total_sold DESC
-        LIMIT 10
-        """
-
-        # Get category performance
-        category_performance_query = """
-        SELECT 
-            c.category_name,
-            COUNT(DISTINCT p.product_id) as product_count,
-            SUM(oi.quantity) as total_sold,
-            SUM(oi.total_price) as revenue,
-            AVG(p.price) as avg_price
-        FROM categories c
-        JOIN products p ON c.category_id = p.category_id
-        LEFT JOIN order_items oi ON p.product_id = oi.product_id
-        LEFT JOIN orders o ON oi.order_id = o.order_id AND o.order_status IN ('PROCESSING', 'DELIVERED')
-        WHERE p.is_active = TRUE
-        GROUP BY c.category_id, c.category_name
-        ORDER BY revenue DESC
-        """
-
-        # Get inventory status
-        inventory_query = """
-        SELECT 
-            COUNT(*) as total_products,
-            SUM(CASE WHEN stock_quantity <= min_stock_level THEN 1 ELSE 0 END) as low_stock_count,
-            SUM(CASE WHEN stock_quantity = 0 THEN 1 ELSE 0 END) as out_of_stock_count,
-            AVG(stock_quantity) as avg_stock_level,
-            SUM(stock_quantity * cost_price) as total_inventory_value
-        FROM products 
-        WHERE is_active = TRUE
-        """
-
-        top_selling = db.execute_query(top_selling_query, fetch=True)
-        category_performance = db.execute_query(category_performance_query, fetch=True)
-        inventory_stats = db.execute_query(inventory_query, fetch=True)
-
-        print(f"Top selling products: {top_selling}")
-        print(f"Category performance: {category_performance}")
-        print(f"Inventory stats: {inventory_stats}")
+        # ?fresh=1 bypasses the snapshot and runs the aggregations now
+        if request.args.get('fresh', '').lower() in ('1', 'true', 'yes'):
+            payload = compute_product_analytics()
+            generated_at = datetime.now()
+        else:
+            payload, generated_at = product_analytics_snapshot.get()
 
         return jsonify({
-            'top_selling_products': top_selling or [],
-            'category_performance': category_performance or [],
-            'inventory_statistics': inventory_stats[0] if inventory_stats else {}
+            **payload,
+            'generated_at': generated_at.isoformat()
         })
 
     except Exception as e:
@@ -366,66 +588,77 @@ def get_suppliers():
         ORDER BY company_name
         """
         
-        suppliers = db.execute_query(query, fetch=True)
-        return jsonify({'suppliers': suppliers})
+        return conditional_catalog_response(
+            'suppliers', ('suppliers',),
+            lambda: {'suppliers': db.execute_query(query, fetch=True)}
+        )
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # ADMIN PRODUCT MANAGEMENT ROUTES
 
+PRODUCT_REQUIRED_FIELDS = ['product_name', 'category_id', 'supplier_id', 'price', 'stock_quantity']
+
+PRODUCT_INSERT_QUERY = """
+INSERT INTO products (
+    product_name, category_id, supplier_id, brand, model, 
+    description, price, cost_price, stock_quantity, 
+    weight, warranty_period, featured
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def build_product_params(data):
+    """Validate product input and return PRODUCT_INSERT_QUERY params (raises ValueError)"""
+    # Validate required fields
+    for field in PRODUCT_REQUIRED_FIELDS:
+        if field not in data:
+            raise ValueError(f'Missing required field: {field}')
+
+    # Convert string values to appropriate types
+    try:
+        price = float(data['price'])
+        cost_price = float(data.get('cost_price', 0)) if data.get('cost_price') else price * 0.75
+        stock_quantity = int(data['stock_quantity'])
+        weight = float(data.get('weight', 0)) if data.get('weight') else None
+        warranty_period = int(data.get('warranty_period', 12))
+        category_id = int(data['category_id'])
+        supplier_id = int(data['supplier_id'])
+    except (ValueError, TypeError):
+        raise ValueError('Invalid data types for numeric fields')
+
+    featured = data.get('featured', False)
+    if isinstance(featured, str):
+        featured = featured.strip().lower() in ('1', 'true', 'yes')
+
+    return (
+        data['product_name'],
+        category_id,
+        supplier_id,
+        data.get('brand', ''),
+        data.get('model', ''),
+        data.get('description', ''),
+        price,
+        cost_price,
+        stock_quantity,
+        weight,
+        warranty_period,
+        featured
+    )
+
 @products_bp.route('/admin', methods=['POST'])
 def create_product():
     try:
         data = request.get_json()
-        print(f"Product creation request data: {data}")
+        logger.debug("Product creation request data: %s", capped(data))
         
-        # Validate required fields
-        required_fields = ['product_name', 'category_id', 'supplier_id', 'price', 'stock_quantity']
-        for field in required_fields:
-            if field not in data:
-                print(f"Missing required field: {field}")
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-
-        # Convert string values to appropriate types
         try:
-            price = float(data['price'])
-            cost_price = float(data.get('cost_price', 0)) if data.get('cost_price') else price * 0.75
-            stock_quantity = int(data['stock_quantity'])
-            weight = float(data.get('weight', 0)) if data.get('weight') else None
-            warranty_period = int(data.get('warranty_period', 12))
-            category_id = int(data['category_id'])
-            supplier_id = int(data['supplier_id'])
-        except (ValueError, TypeError) as e:
-            print(f"Type conversion error: {e}")
-            return jsonify({'error': 'Invalid data types for numeric fields'}), 400
-
-        query = """
-        INSERT INTO products (
-            product_name, category_id, supplier_id, brand, model, 
-            description, price, cost_price, stock_quantity, 
-            weight, warranty_period, featured
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
+            params = build_product_params(data)
+        except ValueError as e:
+            logger.info("Product validation error: %s", e)
+            return jsonify({'error': str(e)}), 400
         
-        params = (
-            data['product_name'],
-            category_id,
-            supplier_id,
-            data.get('brand', ''),
-            data.get('model', ''),
-            data.get('description', ''),
-            price,
-            cost_price,
-            stock_quantity,
-            weight,
-            warranty_period,
-            data.get('featured', False)
-        )
-        
-        print(f"Product creation params: {params}")
-        result = db.execute_query(query, params)
-        print(f"Product creation result: {result}")
+        result = db.execute_query(PRODUCT_INSERT_QUERY, params)
         
         if result:
             return jsonify({
@@ -436,9 +669,108 @@ def create_product():
             return jsonify({'error': 'Failed to create product'}), 500
 
     except Exception as e:
-        print(f"Product creation error: {e}")
-        import traceback
-        print(f"Product creation traceback: {traceback.format_exc()}")
+        logger.exception("Product creation error")
+        return jsonify({'error': str(e)}), 500
+
+def iter_bulk_product_rows(stream, input_format):
+    """Yield (row_number, data, error) from a streamed CSV or NDJSON body"""
+    lines = (line.decode('utf-8-sig') for line in stream)
+
+    if input_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row_number, row in enumerate(reader, start=1):
+            # Empty cells are treated as missing so defaults apply
+            yield row_number, {key: value for key, value in row.items() if key and value not in (None, '')}, None
+        return
+
+    for row_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield row_number, None, 'Invalid JSON'
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, 'Each line must be a JSON object'
+            continue
+        yield row_number, data, None
+
+def insert_product_batch(connection, cursor, batch, errors):
+    """Insert a batch with executemany in one transaction; on failure retry row by row to report errors"""
+    try:
+        connection.start_transaction()
+        cursor.executemany(PRODUCT_INSERT_QUERY, [params for _, params in batch])
+        connection.commit()
+        return len(batch)
+    except Error:
+        connection.rollback()
+
+    inserted = 0
+    for row_number, params in batch:
+        try:
+            cursor.execute(PRODUCT_INSERT_QUERY, params)
+            inserted += 1
+        except Error as e:
+            errors.append({'row': row_number, 'error': str(e)})
+    return inserted
+
+@products_bp.route('/admin/bulk', methods=['POST'])
+def bulk_create_products():
+    """Import products from a streamed CSV or NDJSON body in batched transactions"""
+    try:
+        input_format = request.args.get('format')
+        if not input_format:
+            input_format = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'ndjson'
+        if input_format not in ('csv', 'ndjson'):
+            return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+        try:
+            batch_size = min(max(int(request.args.get('batch_size', 500)), 1), 5000)
+        except ValueError:
+            return jsonify({'error': 'batch_size must be an integer'}), 400
+
+        connection = db.get_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+
+        inserted = 0
+        total_rows = 0
+        errors = []
+        batch = []
+
+        try:
+            cursor = connection.cursor()
+            for row_number, data, error in iter_bulk_product_rows(request.stream, input_format):
+                total_rows += 1
+                if error is None:
+                    try:
+                        batch.append((row_number, build_product_params(data)))
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    errors.append({'row': row_number, 'error': error})
+
+                if len(batch) >= batch_size:
+                    inserted += insert_product_batch(connection, cursor, batch, errors)
+                    batch = []
+
+            if batch:
+                inserted += insert_product_batch(connection, cursor, batch, errors)
+        finally:
+            cursor.close()
+            connection.close()
+
+        errors.sort(key=lambda error: error['row'])
+        return jsonify({
+            'message': 'Bulk import completed',
+            'total_rows': total_rows,
+            'inserted': inserted,
+            'failed': len(errors),
+            'errors': errors
+        }), 200 if inserted or not errors else 400
+
+    except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @products_bp.route('/admin/<int:product_id>', methods=['PUT'])
@@ -475,6 +807,8 @@ def update_product(product_id):
         result = db.execute_query(query, params)
         
         if result is not None:
+            if 'price' in data or 'is_active' in data:
+                cart_summary_cache.invalidate_product(product_id)
             return jsonify({'message': 'Product updated successfully'})
         else:
             return jsonify({'error': 'Product not found'}), 404
@@ -495,6 +829,7 @@ def delete_product(product_id):
         result = db.execute_query(query, (product_id,))
         
         if result is not None:
+            cart_summary_cache.invalidate_product(product_id)
             return jsonify({'message': 'Product deleted successfully'})
         else:
             return jsonify({'error': 'Product not found'}), 404
@@ -526,4 +861,155 @@ def update_stock(product_id):
     except Exception as e:
         if 'Insufficient stock' in str(e):
             return jsonify({'error': 'Insufficient stock'}), 400
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+def lock_products(cursor, product_ids, active_only=False):
+    """SELECT ... FOR UPDATE the given products in primary-key order; returns {product_id: row}"""
+    product_ids = sorted(set(product_ids))
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    active_condition = "AND is_active = TRUE" if active_only else ""
+
+    cursor.execute(f"""
+    SELECT product_id, product_name, price, stock_quantity, reserved_quantity
+    FROM products
+    WHERE product_id IN ({placeholders}) {active_condition}
+    ORDER BY product_id
+    FOR UPDATE
+    """, product_ids)
+    return {row['product_id']: row for row in cursor.fetchall()}
+
+def write_stock_levels(cursor, stock_levels):
+    """Set stock_quantity for many products with a single UPDATE ... CASE"""
+    product_ids = sorted(stock_levels)
+    case_params = []
+    for product_id in product_ids:
+        case_params.extend([product_id, stock_levels[product_id]])
+
+    cursor.execute(f"""
+    UPDATE products
+    SET stock_quantity = CASE product_id {' '.join(['WHEN %s THEN %s'] * len(product_ids))} END,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE product_id IN ({', '.join(['%s'] * len(product_ids))})
+    """, case_params + product_ids)
+
+def insert_inventory_logs(cursor, log_rows):
+    """Batch insert (product_id, transaction_type, quantity_change, previous_quantity,
+    new_quantity, reason, reference_id, employee_id) rows into inventory_logs"""
+    cursor.executemany("""
+    INSERT INTO inventory_logs (
+        product_id, transaction_type, quantity_change, 
+        previous_quantity, new_quantity, reason, reference_id, employee_id
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, log_rows)
+
+def apply_stock_adjustments(adjustments, employee_id=None):
+    """Apply (product_id, quantity_change, transaction_type, reason) changes in one transaction.
+
+    Affected rows are locked in primary-key order, all stock values are written
+    with a single UPDATE ... CASE and the inventory_logs rows with one batched
+    insert. Raises LookupError for unknown products and ValueError when a change
+    would make stock negative; nothing is written in either case.
+    """
+    product_ids = sorted({adjustment[0] for adjustment in adjustments})
+
+    connection = db.get_connection()
+    if not connection:
+        raise RuntimeError('Database connection failed')
+
+    try:
+        cursor = connection.cursor(dictionary=True)
+        connection.start_transaction()
+
+        locked = lock_products(cursor, product_ids)
+        missing = [product_id for product_id in product_ids if product_id not in locked]
+        if missing:
+            raise LookupError(f'Products not found: {missing}')
+
+        stock = {product_id: row['stock_quantity'] for product_id, row in locked.items()}
+        previous_stock = dict(stock)
+        insufficient = []
+        log_rows = []
+        for product_id, quantity_change, transaction_type, reason in adjustments:
+            new_stock = stock[product_id] + quantity_change
+            if new_stock < 0:
+                insufficient.append(product_id)
+            log_rows.append((
+                product_id, transaction_type, quantity_change,
+                stock[product_id], new_stock, reason, None, employee_id
+            ))
+            stock[product_id] = new_stock
+
+        if insufficient:
+            raise ValueError(f'Insufficient stock for products: {sorted(set(insufficient))}')
+
+        write_stock_levels(cursor, stock)
+        insert_inventory_logs(cursor, log_rows)
+
+        connection.commit()
+
+        return [
+            {
+                'product_id': product_id,
+                'previous_stock': previous_stock[product_id],
+                'new_stock': stock[product_id]
+            }
+            for product_id in product_ids
+        ]
+
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+@products_bp.route('/admin/stock/bulk', methods=['POST'])
+def bulk_update_stock():
+    """Apply many stock adjustments (e.g. warehouse receiving) in a single transaction"""
+    try:
+        data = request.get_json()
+        
+        if not isinstance(data, dict) or not data.get('adjustments'):
+            return jsonify({'error': 'adjustments is required'}), 400
+        
+        if not isinstance(data['adjustments'], list):
+            return jsonify({'error': 'adjustments must be a list'}), 400
+        
+        if len(data['adjustments']) > 1000:
+            return jsonify({'error': 'At most 1000 adjustments per request'}), 400
+        
+        employee_id = data.get('employee_id', 1)  # Default admin employee
+        
+        adjustments = []
+        for index, item in enumerate(data['adjustments']):
+            if not isinstance(item, dict) or 'product_id' not in item or 'quantity_change' not in item:
+                return jsonify({'error': f'Adjustment {index} must have product_id and quantity_change'}), 400
+            transaction_type = item.get('transaction_type', 'ADJUSTMENT')
+            if transaction_type not in INVENTORY_TRANSACTION_TYPES:
+                return jsonify({'error': f'Adjustment {index} has invalid transaction_type. Must be one of: {list(INVENTORY_TRANSACTION_TYPES)}'}), 400
+            try:
+                adjustments.append((
+                    int(item['product_id']),
+                    int(item['quantity_change']),
+                    transaction_type,
+                    item.get('reason', 'Bulk stock adjustment')
+                ))
+            except (ValueError, TypeError):
+                return jsonify({'error': f'Adjustment {index} has invalid numeric values'}), 400
+        
+        results = apply_stock_adjustments(adjustments, employee_id)
+        
+        return jsonify({
+            'message': 'Stock updated successfully',
+            'adjustment_count': len(adjustments),
+            'product_count': len(results),
+            'total_quantity_change': sum(adjustment[1] for adjustment in adjustments),
+            'products': results
+        })
+
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,295 @@
+from db.db_config import DatabaseConfig
+from log_config import get_logger
+import os
+import threading
+import time
+
+db = DatabaseConfig()
+logger = get_logger('reservations')
+
+class ReservationLedger:
+    """Expiring stock holds for high-contention SKUs.
+
+    Each (customer, product) pair holds at most one row in stock_reservations and
+    products.reserved_quantity carries the sum of those holds, so a hold is taken
+    with one conditional UPDATE instead of a long-lived SELECT ... FOR UPDATE.
+    A per-SKU available-to-promise counter kept in memory lets sold-out products
+    be rejected without a database round trip; it is refreshed from the database
+    after every write and expires after atp_ttl seconds because other workers
+    change the same rows. A daemon thread reaps expired holds in small batches.
+    """
+
+    def __init__(self, hold_ttl, reap_interval, atp_ttl=2, reap_batch_size=500):
+        self.hold_ttl = hold_ttl
+        self.reap_interval = reap_interval
+        self.atp_ttl = atp_ttl
+        self.reap_batch_size = reap_batch_size
+        self._available = {}  # product_id -> (available_to_promise, loaded_at)
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def available(self, product_id):
+        """Return available-to-promise for a product (stock minus active holds)"""
+        cached = self._cached_available(product_id)
+        if cached is not None:
+            return cached
+
+        result = db.execute_query(
+            "SELECT stock_quantity - reserved_quantity as available FROM products WHERE product_id = %s AND is_active = TRUE",
+            (product_id,), fetch=True
+        )
+        available = result[0]['available'] if result else 0
+        self._remember(product_id, available)
+        return available
+
+    def reserve(self, customer_id, product_id, quantity, increment=False):
+        """Set the customer's hold on a product to quantity (or raise it by quantity
+        when increment is set); returns False if stock is short"""
+        return product_id in self.reserve_many(customer_id, {product_id: quantity}, increment)
+
+    def reserve_many(self, customer_id, quantities, increment=False):
+        """Set (or with increment, raise) the customer's holds for {product_id: quantity}
+        in one transaction; returns the product ids held. Products short of stock
+        keep their previous hold."""
+        self._ensure_reaper()
+        product_ids = sorted(quantities)
+        if not product_ids:
+            return set()
+        product_list = ', '.join(['%s'] * len(product_ids))
+
+        connection = db.get_connection()
+        if not connection:
+            raise RuntimeError('Database connection failed')
+
+        cursor = connection.cursor(dictionary=True)
+        try:
+            connection.start_transaction()
+
+            # Write the hold rows before locking them: a locking read of a row that
+            # does not exist yet takes a gap lock, and two requests for the same
+            # new hold would then deadlock on each other's insert
+            placeholders = []
+            for product_id in product_ids:
+                placeholders.extend([customer_id, product_id, self.hold_ttl])
+            cursor.execute(f"""
+            INSERT INTO stock_reservations (customer_id, product_id, quantity, expires_at)
+            VALUES {', '.join(['(%s, %s, 0, NOW() + INTERVAL %s SECOND)'] * len(product_ids))}
+            ON DUPLICATE KEY UPDATE quantity = quantity
+            """, placeholders)
+            cursor.execute(f"""
+            SELECT product_id, quantity FROM stock_reservations
+            WHERE customer_id = %s AND product_id IN ({product_list})
+            FOR UPDATE
+            """, [customer_id] + product_ids)
+            held = {row['product_id']: row['quantity'] for row in cursor.fetchall()}
+
+            granted = {}
+            for product_id in product_ids:
+                delta = quantities[product_id] if increment else quantities[product_id] - held[product_id]
+                delta = max(delta, -held[product_id])  # never give back more than is held
+
+                # Sold-out fast path: no need to touch the hot products row
+                cached = self._cached_available(product_id)
+                if delta > 0 and cached is not None and cached < delta:
+                    continue
+
+                if delta > 0:
+                    cursor.execute("""
+                    UPDATE products
+                    SET reserved_quantity = reserved_quantity + %s
+                    WHERE product_id = %s AND is_active = TRUE
+                    AND stock_quantity - reserved_quantity >= %s
+                    """, (delta, product_id, delta))
+                    if cursor.rowcount == 0:
+                        continue
+                elif delta < 0:
+                    cursor.execute("""
+                    UPDATE products
+                    SET reserved_quantity = GREATEST(reserved_quantity + %s, 0)
+                    WHERE product_id = %s
+                    """, (delta, product_id))
+                granted[product_id] = held[product_id] + delta
+
+            if granted:
+                # Expiry uses the database clock, which the reaper compares against
+                granted_ids = sorted(granted)
+                case_params = []
+                for product_id in granted_ids:
+                    case_params.extend([product_id, granted[product_id]])
+                cursor.execute(f"""
+                UPDATE stock_reservations
+                SET quantity = CASE product_id {' '.join(['WHEN %s THEN %s'] * len(granted_ids))} END,
+                    expires_at = NOW() + INTERVAL %s SECOND
+                WHERE customer_id = %s AND product_id IN ({', '.join(['%s'] * len(granted_ids))})
+                """, case_params + [self.hold_ttl, customer_id] + granted_ids)
+
+            refused = [product_id for product_id in product_ids if product_id not in granted]
+            if refused:
+                # Drop only the placeholders written above; earlier holds stay as they were
+                cursor.execute(f"""
+                DELETE FROM stock_reservations
+                WHERE customer_id = %s AND quantity = 0
+                AND product_id IN ({', '.join(['%s'] * len(refused))})
+                """, [customer_id] + refused)
+
+            cursor.execute(
+                f"SELECT product_id, stock_quantity - reserved_quantity as available FROM products WHERE product_id IN ({product_list})",
+                product_ids
+            )
+            rows = cursor.fetchall()
+            connection.commit()
+
+            for row in rows:
+                self._remember(row['product_id'], row['available'])
+            return set(granted)
+
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            connection.close()
+
+    def release(self, customer_id, product_ids=None):
+        """Drop the customer's holds (all of them, or only for product_ids)"""
+        connection = db.get_connection()
+        if not connection:
+            raise RuntimeError('Database connection failed')
+
+        try:
+            cursor = connection.cursor(dictionary=True)
+            connection.start_transaction()
+            released = self.consume(cursor, customer_id, product_ids)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            connection.close()
+
+        for product_id in released:
+            self.invalidate(product_id)
+        return released
+
+    def consume(self, cursor, customer_id, product_ids=None):
+        """Remove the customer's holds inside the caller's transaction.
+
+        Returns {product_id: held_quantity}; reserved_quantity is decremented so
+        the caller (e.g. checkout) can take the stock the holds were covering.
+        """
+        product_filter = ""
+        params = [customer_id]
+        if product_ids is not None:
+            if not product_ids:
+                return {}
+            product_filter = f"AND product_id IN ({', '.join(['%s'] * len(product_ids))})"
+            params.extend(product_ids)
+
+        cursor.execute(f"""
+        SELECT reservation_id, product_id, quantity
+        FROM stock_reservations
+        WHERE customer_id = %s {product_filter}
+        FOR UPDATE
+        """, params)
+        holds = cursor.fetchall()
+        if not holds:
+            return {}
+
+        self._remove_holds(cursor, holds)
+        return {hold['product_id']: hold['quantity'] for hold in holds}
+
+    def reap(self):
+        """Delete expired holds in small batches and return how many were removed"""
+        removed = 0
+        while True:
+            connection = db.get_connection()
+            if not connection:
+                return removed
+
+            try:
+                cursor = connection.cursor(dictionary=True)
+                connection.start_transaction()
+                cursor.execute("""
+                SELECT reservation_id, product_id, quantity
+                FROM stock_reservations
+                WHERE expires_at <= NOW()
+                ORDER BY expires_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+                """, (self.reap_batch_size,))
+                holds = cursor.fetchall()
+                if holds:
+                    self._remove_holds(cursor, holds)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+                connection.close()
+
+            for hold in holds:
+                self.invalidate(hold['product_id'])
+            removed += len(holds)
+            if len(holds) < self.reap_batch_size:
+                return removed
+
+    def _remove_holds(self, cursor, holds):
+        reservation_ids = [hold['reservation_id'] for hold in holds]
+        cursor.execute(
+            f"DELETE FROM stock_reservations WHERE reservation_id IN ({', '.join(['%s'] * len(reservation_ids))})",
+            reservation_ids
+        )
+
+        released = {}
+        for hold in holds:
+            released[hold['product_id']] = released.get(hold['product_id'], 0) + hold['quantity']
+
+        product_ids = sorted(released)
+        case_params = []
+        for product_id in product_ids:
+            case_params.extend([product_id, released[product_id]])
+
+        cursor.execute(f"""
+        UPDATE products
+        SET reserved_quantity = GREATEST(reserved_quantity - CASE product_id {' '.join(['WHEN %s THEN %s'] * len(product_ids))} END, 0)
+        WHERE product_id IN ({', '.join(['%s'] * len(product_ids))})
+        """, case_params + product_ids)
+
+    def _cached_available(self, product_id):
+        with self._lock:
+            cached = self._available.get(product_id)
+        if cached and time.monotonic() - cached[1] < self.atp_ttl:
+            return cached[0]
+        return None
+
+    def _remember(self, product_id, available):
+        with self._lock:
+            self._available[product_id] = (available, time.monotonic())
+
+    def invalidate(self, product_id):
+        """Drop the cached available-to-promise for a product"""
+        with self._lock:
+            self._available.pop(product_id, None)
+
+    def _ensure_reaper(self):
+        if self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._run_reaper, name='reservation-reaper', daemon=True)
+                self._reaper.start()
+
+    def _run_reaper(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception:
+                logger.exception("Reservation reaper error")
+
+reservation_ledger = ReservationLedger(
+    hold_ttl=int(os.getenv('STOCK_HOLD_TTL_SECONDS', 900)),
+    reap_interval=int(os.getenv('STOCK_HOLD_REAP_SECONDS', 60))
+)
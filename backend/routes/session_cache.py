@@ -0,0 +1,173 @@
+from db.db_config import DatabaseConfig
+from log_config import get_logger
+from collections import OrderedDict
+from datetime import datetime
+import os
+import threading
+import time
+
+db = DatabaseConfig()
+logger = get_logger('session_cache')
+
+class SessionCache:
+    """Validated sessions cached in process memory (TTL + LRU).
+
+    An entry lives for at most ttl seconds and never past the session's own
+    expires_at; the least recently used entries are evicted beyond max_size.
+    invalidate() drops an entry locally and records the session in
+    session_revocations; every worker polls that table every poll_interval
+    seconds and drops the sessions revoked elsewhere, so a logout is honoured
+    by all workers within poll_interval (and at worst after ttl).
+
+    The time of every invalidation seen here (local or polled) is kept for ttl
+    seconds, and put() drops an entry whose lookup began before the session's
+    last invalidation, so a lookup that raced a logout cannot cache the
+    logged-out session again.
+
+    Revocations recorded with an expires_at (signed session tokens, which are
+    never looked up in the database) are also kept in a revocation list that
+    is checked by is_revoked() until the token would have expired anyway.
+    """
+
+    def __init__(self, max_size, ttl, poll_interval):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._entries = OrderedDict()  # session_id -> (session_info, valid_until)
+        self._invalidated = {}  # session_id -> monotonic time of its last invalidation
+        self._lock = threading.Lock()
+        self._revoked = {}  # token id -> expires_at
+        self._last_revocation_id = None
+        self._poll_lock = threading.Lock()
+        self._poller = None
+
+    def get(self, session_id):
+        """Return cached session info or None"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return entry[0]
+
+    def lookup_started(self):
+        """Mark the start of a database lookup; pass the result to put()"""
+        return time.monotonic()
+
+    def put(self, session_id, session_info, expires_at, looked_up_at):
+        """Cache session info until min(ttl, expires_at), unless the session was
+        invalidated after the lookup that produced it began"""
+        self._ensure_poller()
+        lifetime = min(self.ttl, (expires_at - datetime.now()).total_seconds())
+        if lifetime <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            # Invalidations are only remembered for ttl seconds, so older lookups are not trusted
+            if now - looked_up_at >= self.ttl or self._invalidated.get(session_id, looked_up_at - 1) >= looked_up_at:
+                return
+            self._entries[session_id] = (session_info, now + lifetime)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _forget(self, session_id):
+        """Drop a cached session and note when (caller holds the lock)"""
+        self._entries.pop(session_id, None)
+        self._invalidated[session_id] = time.monotonic()
+
+    def invalidate(self, session_id, broadcast=True, expires_at=None):
+        """Drop a session here and (by default) tell the other workers to drop it too.
+
+        Pass expires_at to keep the id on the revocation list until then.
+        """
+        with self._lock:
+            self._forget(session_id)
+            if expires_at is not None:
+                self._revoked[session_id] = expires_at
+        if broadcast:
+            recorded = db.execute_query(
+                "INSERT INTO session_revocations (session_id, expires_at) VALUES (%s, %s)",
+                (session_id, expires_at)
+            )
+            if recorded is None:
+                # Other workers would keep honouring the session
+                raise RuntimeError('Failed to record session revocation')
+
+    def is_revoked(self, token_id):
+        """True if the id is on the revocation list (loaded from the database on first use).
+
+        Until the list has loaded once every id counts as revoked, since a
+        logout recorded elsewhere could not be seen yet.
+        """
+        if self._last_revocation_id is None:
+            self._ensure_poller()
+            self.poll_revocations()
+            if self._last_revocation_id is None:
+                logger.warning("Session revocation list not loaded; refusing signed session")
+                return True
+        with self._lock:
+            expires_at = self._revoked.get(token_id)
+        return expires_at is not None and expires_at > datetime.now()
+
+    def poll_revocations(self):
+        """Pick up sessions revoked by other workers since the last poll"""
+        with self._poll_lock:
+            if self._last_revocation_id is None:
+                # Start from the newest revocation, keeping the ids that still matter
+                results = db.execute_multi_statement([
+                    ("SELECT COALESCE(MAX(revocation_id), 0) as last_id FROM session_revocations", None),
+                    ("SELECT session_id, expires_at FROM session_revocations WHERE expires_at > NOW()", None)
+                ])
+                if results is None:
+                    return
+                with self._lock:
+                    for row in results[1]:
+                        self._revoked[row['session_id']] = row['expires_at']
+                self._last_revocation_id = results[0][0]['last_id']
+                return
+
+            revoked = db.execute_query("""
+            SELECT revocation_id, session_id, expires_at FROM session_revocations
+            WHERE revocation_id > %s
+            ORDER BY revocation_id
+            """, (self._last_revocation_id,), fetch=True)
+
+            now = datetime.now()
+            with self._lock:
+                for row in revoked or []:
+                    self._forget(row['session_id'])
+                    if row['expires_at'] is not None:
+                        self._revoked[row['session_id']] = row['expires_at']
+                for token_id in [t for t, expires_at in self._revoked.items() if expires_at <= now]:
+                    del self._revoked[token_id]
+                forget_before = time.monotonic() - self.ttl
+                for session_id in [s for s, at in self._invalidated.items() if at < forget_before]:
+                    del self._invalidated[session_id]
+            if revoked:
+                self._last_revocation_id = revoked[-1]['revocation_id']
+
+    def _ensure_poller(self):
+        if self._poller is not None:
+            return
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._run_poller, name='session-revocations', daemon=True)
+                self._poller.start()
+
+    def _run_poller(self):
+        while True:
+            try:
+                self.poll_revocations()
+            except Exception:
+                logger.exception("Session revocation poll error")
+            time.sleep(self.poll_interval)
+
+session_cache = SessionCache(
+    max_size=int(os.getenv('SESSION_CACHE_SIZE', 10000)),
+    ttl=int(os.getenv('SESSION_CACHE_TTL_SECONDS', 60)),
+    poll_interval=float(os.getenv('SESSION_REVOCATION_POLL_SECONDS', 2))
+)
@@ -0,0 +1,142 @@
+from db.db_config import DatabaseConfig
+from log_config import get_logger
+from datetime import date, datetime, timedelta
+import os
+import threading
+import time
+
+db = DatabaseConfig()
+logger = get_logger('session_reaper')
+
+def partition_name(day):
+    """Partition holding sessions that expire on day"""
+    return f"p{day.strftime('%Y%m%d')}"
+
+def partition_definition(day):
+    return f"PARTITION {partition_name(day)} VALUES LESS THAN (UNIX_TIMESTAMP('{day + timedelta(days=1)}'))"
+
+class SessionReaper:
+    """Background cleanup of expired user_sessions rows.
+
+    If user_sessions is range-partitioned by day on expires_at (see
+    partition_user_sessions.py), expired days are removed with DROP PARTITION
+    and partitions for the next days_ahead days are created ahead of time;
+    otherwise expired rows are deleted in batches of batch_size so no single
+    statement holds locks for long. Old session_revocations rows, which only
+    need to outlive the session cache, are purged the same way. Partition
+    maintenance takes a named lock so only one worker alters the table.
+    """
+
+    def __init__(self, interval, batch_size, days_ahead):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.days_ahead = days_ahead
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the reaper thread once per process"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='session-reaper', daemon=True)
+                self._thread.start()
+
+    def reap(self):
+        """Remove expired sessions and stale revocations; returns rows (or partitions) removed"""
+        partitions = self._partitions()
+        if partitions:
+            removed = self._maintain_partitions(partitions)
+        else:
+            removed = self._delete_batches(
+                "DELETE FROM user_sessions WHERE expires_at <= NOW() ORDER BY expires_at LIMIT %s"
+            )
+        self._delete_batches("""
+        DELETE FROM session_revocations
+        WHERE (expires_at IS NOT NULL AND expires_at <= NOW())
+        OR (expires_at IS NULL AND revoked_at < NOW() - INTERVAL 1 DAY)
+        LIMIT %s
+        """)
+        return removed
+
+    def _delete_batches(self, query):
+        removed = 0
+        while True:
+            deleted = db.execute_query(query, (self.batch_size,))
+            if not deleted:
+                return removed
+            removed += deleted
+            if deleted < self.batch_size:
+                return removed
+
+    def _partitions(self):
+        """{partition name: upper bound (unix time)} for a partitioned user_sessions, else {}"""
+        rows = db.execute_query("""
+        SELECT partition_name, partition_description
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = 'user_sessions' AND partition_name IS NOT NULL
+        """, fetch=True) or []
+        return {
+            row['partition_name']: None if row['partition_description'] == 'MAXVALUE' else int(row['partition_description'])
+            for row in rows
+        }
+
+    def _maintain_partitions(self, partitions):
+        connection = db.get_connection()
+        if not connection:
+            return 0
+
+        dropped = 0
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("SELECT GET_LOCK('user_sessions_partitions', 0) as acquired")
+            if not cursor.fetchone()['acquired']:
+                return 0
+            try:
+                # Whole days whose sessions have all expired
+                now = time.time()
+                expired = [name for name, bound in partitions.items() if bound is not None and bound <= now]
+                if expired:
+                    cursor.execute(f"ALTER TABLE user_sessions DROP PARTITION {', '.join(expired)}")
+                    dropped = len(expired)
+
+                # Days that will receive new sessions, carved out of the catch-all
+                # partition (ranges can only be added above the last existing day)
+                existing_days = [datetime.strptime(name[1:], '%Y%m%d').date() for name in partitions if name != 'pmax']
+                last_day = max(existing_days, default=date.today() - timedelta(days=1))
+                upcoming = [
+                    date.today() + timedelta(days=offset)
+                    for offset in range(self.days_ahead + 1)
+                    if date.today() + timedelta(days=offset) > last_day
+                ]
+                if upcoming and 'pmax' in partitions:
+                    cursor.execute(f"""
+                    ALTER TABLE user_sessions REORGANIZE PARTITION pmax INTO (
+                        {', '.join(partition_definition(day) for day in upcoming)},
+                        PARTITION pmax VALUES LESS THAN MAXVALUE
+                    )
+                    """)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK('user_sessions_partitions')")
+                cursor.fetchall()
+        finally:
+            cursor.close()
+            connection.close()
+        return dropped
+
+    def _run(self):
+        while True:
+            try:
+                removed = self.reap()
+                if removed:
+                    logger.info("Session reaper removed %s expired sessions/partitions", removed)
+            except Exception:
+                logger.exception("Session reaper error")
+            time.sleep(self.interval)
+
+session_reaper = SessionReaper(
+    interval=int(os.getenv('SESSION_REAP_SECONDS', 300)),
+    batch_size=int(os.getenv('SESSION_REAP_BATCH_SIZE', 1000)),
+    days_ahead=int(os.getenv('SESSION_PARTITION_DAYS_AHEAD', 10))
+)
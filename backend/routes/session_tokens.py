@@ -0,0 +1,100 @@
+from log_config import get_logger
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+
+logger = get_logger('session_tokens')
+
+TOKEN_VERSION = 'v1'
+
+# Flask's fallback SECRET_KEY in app.py; it is public, so never derive a signing key from it
+DEFAULT_SECRET_KEY = 'gadgets-store-secret-key'
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+class SessionTokenSigner:
+    """Self-contained session tokens signed with HMAC-SHA256.
+
+    A token is "v1.<key id>.<claims>.<signature>" where claims carries the user
+    type, user id, expiry and a random token id (jti, used for revocation).
+    Tokens are verified with the key named in the token, so rotating keys is:
+    add the new key, make it active, and drop the old one once the tokens it
+    signed have expired.
+    """
+
+    def __init__(self, keys, active_key_id):
+        if active_key_id not in keys:
+            raise ValueError(f'Active session token key {active_key_id} is not configured')
+        self.keys = keys
+        self.active_key_id = active_key_id
+
+    @staticmethod
+    def is_token(value):
+        """True if value looks like a signed token rather than a UUID session id"""
+        return value.startswith(TOKEN_VERSION + '.')
+
+    def issue(self, user_type, user_id, lifetime_seconds):
+        """Return (token, claims) for a new session"""
+        claims = {
+            'typ': user_type,
+            'sub': user_id,
+            'exp': int(time.time() + lifetime_seconds),
+            'jti': secrets.token_urlsafe(12)
+        }
+        signed = f"{TOKEN_VERSION}.{self.active_key_id}.{_b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))}"
+        return f"{signed}.{self._sign(self.active_key_id, signed)}", claims
+
+    def verify(self, token, check_expiry=True):
+        """Return the token's claims if the signature (and expiry) check out, else None"""
+        try:
+            version, key_id, payload, signature = token.split('.')
+        except ValueError:
+            return None
+        if version != TOKEN_VERSION or key_id not in self.keys:
+            return None
+        try:
+            if not hmac.compare_digest(signature, self._sign(key_id, f"{version}.{key_id}.{payload}")):
+                return None
+        except (TypeError, UnicodeEncodeError):
+            # Non-ASCII input cannot be a token this signer issued
+            return None
+
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if check_expiry and claims.get('exp', 0) <= time.time():
+            return None
+        return claims
+
+    def _sign(self, key_id, signed):
+        return _b64encode(hmac.new(self.keys[key_id], signed.encode('ascii'), hashlib.sha256).digest())
+
+def load_session_token_signer():
+    """Build the signer from SESSION_TOKEN_KEYS ("kid:secret,kid:secret") and
+    SESSION_TOKEN_ACTIVE_KEY; falls back to a single key derived from SECRET_KEY,
+    which must then be set to something other than the built-in default"""
+    keys = {}
+    for part in os.getenv('SESSION_TOKEN_KEYS', '').split(','):
+        if ':' in part:
+            key_id, secret = part.split(':', 1)
+            keys[key_id.strip()] = secret.strip().encode('utf-8')
+
+    if not keys:
+        secret_key = os.getenv('SECRET_KEY')
+        if not secret_key or secret_key == DEFAULT_SECRET_KEY:
+            raise RuntimeError('Signed session tokens need SESSION_TOKEN_KEYS or a non-default SECRET_KEY')
+        keys = {'default': hashlib.sha256(f"session-token:{secret_key}".encode('utf-8')).digest()}
+        active_key_id = 'default'
+    else:
+        active_key_id = os.getenv('SESSION_TOKEN_ACTIVE_KEY') or next(iter(keys))
+
+    return SessionTokenSigner(keys, active_key_id)
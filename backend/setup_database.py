@@ -5,6 +5,8 @@ Behavior:
 - Creates the database if it does not exist.
 - Imports schema and seed files located in backend/db/
 - If environment variable DROP_EXISTING=true, existing tables will be dropped.
+- If the database already has tables, applies the idempotent upgrades in
+  db/migrations.py instead, so existing databases pick up schema changes.
 
 Notes for Railway / container runs:
 - Provide MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE as env vars.
@@ -15,6 +17,7 @@ import re
 import mysql.connector
 from mysql.connector import Error
 from dotenv import load_dotenv
+from db.migrations import apply_migrations
 
 load_dotenv()
 
@@ -82,6 +85,8 @@ def setup_database():
         existing_tables = cursor.fetchall()
         if existing_tables and not drop_existing and not force_setup:
             print(f"Database '{database}' already contains {len(existing_tables)} table(s); skipping schema and seed import. Set DROP_EXISTING=true or FORCE_SETUP=true to override.")
+            print("Applying schema migrations...")
+            apply_migrations(conn)
             cursor.close()
             conn.close()
             return True
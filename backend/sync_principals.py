@@ -0,0 +1,52 @@
+"""Backfill the principals login directory from the user tables.
+
+Registration writes principals directly and triggers keep email, names and
+is_active in step afterwards. setup_database.py backfills a new or empty
+principals table; run this after importing users with password hashes
+straight into admin_users, employees or customers, since such users cannot
+log in until they have a principal:
+
+    python sync_principals.py
+
+Tables (or password_hash/role columns) that do not exist are skipped.
+Existing principals get the current role, names and is_active, but keep their
+password_hash: once a principal exists it owns the hash (rehash-on-login only
+writes principals), so a stale copy in the user table never overwrites it.
+To reset a password, update principals.password_hash directly.
+"""
+
+from db.db_config import DatabaseConfig
+from db import migrations
+
+
+def sync_principals():
+    db = DatabaseConfig()
+    conn = db.get_connection()
+    if not conn:
+        print("❌ Connection failed")
+        return False
+
+    cursor = conn.cursor()
+    try:
+        synced = migrations.sync_principals(cursor)
+        conn.commit()
+        for table, rows in synced.items():
+            if rows is None:
+                print(f"   - {table}: no password_hash column, skipped")
+            else:
+                print(f"   ✓ {table}: {rows} rows synced")
+
+        print("✅ principals synced")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error syncing principals: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    sync_principals()
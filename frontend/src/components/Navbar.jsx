@@ -18,13 +18,11 @@ const API_BASE_URL = 'http://localhost:5000/api'
 const Navbar = ({ customer, onLogout, onShowCart, onShowAdminAuth, isAdminAuthenticated, onAdminLogout }) => {
   const location = useLocation()
 
-  // Fetch cart count
+  // Fetch cart count (summary only; still invalidated with the ['cart', id] queries)
   const { data: cartData } = useQuery({
-    queryKey: ['cart', customer?.customer_id],
+    queryKey: ['cart', customer?.customer_id, 'summary'],
     queryFn: async () => {
-      console.log('Fetching cart for customer:', customer.customer_id)
-      const response = await axios.get(`${API_BASE_URL}/cart/${customer.customer_id}`)
-      console.log('Cart data:', response.data)
+      const response = await axios.get(`${API_BASE_URL}/cart/${customer.customer_id}/summary`)
       return response.data
     },
     enabled: !!customer?.customer_id
@@ -4,7 +4,8 @@ set -e
 
 # Railway/Railpack start script — install deps if needed, change to the backend
 # directory and run gunicorn. Uses PORT env var provided by Railway (defaults
-# to 5000 if not set).
+# to 5000 if not set). A single threaded worker process is used, see
+# backend/entrypoint.sh.
 
 # If gunicorn isn't available in the environment (Railpack may not install
 # dependencies from a requirements.txt in a subdirectory), install deps first.
@@ -15,5 +16,7 @@ if ! command -v gunicorn >/dev/null 2>&1; then
 fi
 
 cd backend
+# Create or upgrade the database schema before serving (see setup_database.py)
+python setup_database.py
 : "${PORT:=5000}"
-exec gunicorn --bind 0.0.0.0:${PORT} "app:create_app()"
+exec gunicorn --bind 0.0.0.0:${PORT} --worker-class gthread --threads ${GUNICORN_THREADS:-16} "app:create_app()"